@@ -0,0 +1,185 @@
+"""
+Admission control for database work, per worker.
+
+- At most REPCHECK_MAX_DB_CONCURRENCY requests hold a database session at once
+  (default: the pool's size + overflow), so requests wait here - in a bounded
+  queue, for a bounded time - rather than on the pool or a threadpool thread.
+- A full queue is answered right away with 429, a request that waited
+  REPCHECK_DB_QUEUE_TIMEOUT seconds with 503 - both with Retry-After.
+- Every transaction a request's session begins gets a Postgres statement_timeout
+  for its route (see ROUTE_STATEMENT_TIMEOUTS_MS), and a statement cancelled by
+  it becomes a 503 instead of a 500.
+
+Queue depth, in-flight count and shed requests are on /api/status/metrics.
+"""
+from typing import Dict, Optional
+import asyncio
+import json
+import logging
+import os
+import time
+
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import metrics
+
+log = logging.getLogger(__name__)
+
+# 0 turns admission control off
+MAX_DB_CONCURRENCY = os.getenv("REPCHECK_MAX_DB_CONCURRENCY")
+DB_QUEUE_SIZE = int(os.getenv("REPCHECK_DB_QUEUE_SIZE", "50"))
+DB_QUEUE_TIMEOUT = float(os.getenv("REPCHECK_DB_QUEUE_TIMEOUT", "5"))
+RETRY_AFTER_SECONDS = int(os.getenv("REPCHECK_RETRY_AFTER", "2"))
+
+# Per transaction, in ms (0 = none) - routes not listed get the default
+STATEMENT_TIMEOUT_MS = int(os.getenv("REPCHECK_STATEMENT_TIMEOUT_MS", "15000"))
+ROUTE_STATEMENT_TIMEOUTS_MS = {
+    "/api/people/{zip_code}": 5000,
+    "/api/zipcodes/{zip_code}": 5000,
+    "/api/zipcodes/{zip_code}/bills": 10000,
+    "/api/bills/search": 5000,
+    "/api/bills/votes": 5000,
+    "/api/precincts/tiles/{z}/{x}/{y}.mvt": 10000,
+    "/api/bills/summaries": 60000,
+}
+# e.g. REPCHECK_ROUTE_STATEMENT_TIMEOUTS='{"/api/bills/votes": 2000}'
+ROUTE_STATEMENT_TIMEOUTS_MS.update(json.loads(os.getenv("REPCHECK_ROUTE_STATEMENT_TIMEOUTS", "{}")))
+
+# Postgres' query_canceled, which is what a statement_timeout raises
+QUERY_CANCELED = "57014"
+STATEMENT_TIMEOUT_INFO_KEY = "repcheck_statement_timeout_ms"
+
+
+class AdmissionController:
+    """
+    An asyncio semaphore with a bounded number of waiters and a bounded wait.
+    Lives on the worker's event loop - acquire/release from async code only.
+    """
+
+    def __init__(self, limit: int, queue_size: int, queue_timeout: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(limit) if limit > 0 else None
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.queue_wait_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self._semaphore is not None
+
+    def _overloaded(self, status_code: int, detail: str) -> HTTPException:
+        return HTTPException(
+            status_code=status_code, detail=detail, headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+        )
+
+    async def acquire(self):
+        if self._semaphore is None:
+            return
+        if self._semaphore.locked():
+            if self.queued >= self.queue_size:
+                self.shed_queue_full += 1
+                raise self._overloaded(429, "Too many requests, try again shortly.")
+            self.queued += 1
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.shed_timeout += 1
+                raise self._overloaded(503, "Server is busy, try again shortly.")
+            finally:
+                self.queued -= 1
+                self.queue_wait_seconds += time.perf_counter() - start
+        else:
+            await self._semaphore.acquire()
+        self.in_flight += 1
+        self.admitted += 1
+
+    def release(self):
+        if self._semaphore is None:
+            return
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> Dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "queue_size": self.queue_size,
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+            "queue_wait_seconds": self.queue_wait_seconds,
+        }
+
+    def metric_lines(self):
+        pid = os.getpid()
+        stats = self.stats()
+        yield "# HELP repcheck_db_admission_in_flight Requests holding a database session."
+        yield "# TYPE repcheck_db_admission_in_flight gauge"
+        yield f'repcheck_db_admission_in_flight{{pid="{pid}"}} {stats["in_flight"]}'
+        yield "# HELP repcheck_db_admission_queue_depth Requests waiting for a database session."
+        yield "# TYPE repcheck_db_admission_queue_depth gauge"
+        yield f'repcheck_db_admission_queue_depth{{pid="{pid}"}} {stats["queued"]}'
+        yield "# HELP repcheck_db_admission_limit Max requests holding a database session."
+        yield "# TYPE repcheck_db_admission_limit gauge"
+        yield f'repcheck_db_admission_limit{{pid="{pid}"}} {stats["limit"]}'
+        yield "# HELP repcheck_db_admission_admitted_total Requests admitted."
+        yield "# TYPE repcheck_db_admission_admitted_total counter"
+        yield f'repcheck_db_admission_admitted_total{{pid="{pid}"}} {stats["admitted"]}'
+        yield "# HELP repcheck_db_admission_shed_total Requests turned away, by reason."
+        yield "# TYPE repcheck_db_admission_shed_total counter"
+        yield f'repcheck_db_admission_shed_total{{pid="{pid}",reason="queue_full"}} {stats["shed_queue_full"]}'
+        yield f'repcheck_db_admission_shed_total{{pid="{pid}",reason="queue_timeout"}} {stats["shed_timeout"]}'
+        yield "# HELP repcheck_db_admission_queue_wait_seconds_total Time spent queued for a session."
+        yield "# TYPE repcheck_db_admission_queue_wait_seconds_total counter"
+        yield f'repcheck_db_admission_queue_wait_seconds_total{{pid="{pid}"}} {stats["queue_wait_seconds"]!r}'
+
+
+def create_controller(pool_capacity: int) -> AdmissionController:
+    limit = int(MAX_DB_CONCURRENCY) if MAX_DB_CONCURRENCY is not None else pool_capacity
+    controller = AdmissionController(limit, DB_QUEUE_SIZE, DB_QUEUE_TIMEOUT)
+    metrics.registry.collectors.append(controller.metric_lines)
+    return controller
+
+
+def statement_timeout_ms(route_path: Optional[str]) -> int:
+    return ROUTE_STATEMENT_TIMEOUTS_MS.get(route_path, STATEMENT_TIMEOUT_MS)
+
+
+def is_statement_timeout(exception: Optional[BaseException]) -> bool:
+    """
+    Whether `exception` (or what it was raised while handling - the routes turn
+    DB errors into a 500 HTTPException) is a cancelled statement.
+    """
+    seen = set()
+    while exception is not None and id(exception) not in seen:
+        seen.add(id(exception))
+        orig = getattr(exception, "orig", None)
+        if getattr(orig, "pgcode", None) == QUERY_CANCELED:
+            return True
+        exception = exception.__cause__ or exception.__context__
+    return False
+
+
+def statement_timeout_error() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="The query took too long, try again shortly.",
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+    )
+
+
+@event.listens_for(Session, "after_begin")
+def _set_statement_timeout(session, transaction, connection):
+    # Set on the sessions get_async_session hands out; LOCAL ends with the transaction
+    timeout_ms = session.info.get(STATEMENT_TIMEOUT_INFO_KEY)
+    if timeout_ms:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
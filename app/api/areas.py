@@ -1,44 +1,201 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 import traceback
+from functools import partial
 import logging
-from sqlalchemy.sql import select, func
-from sqlalchemy.orm import Session
-from geoalchemy2.shape import to_shape
+from typing import Optional
+from sqlalchemy.sql import select, func, and_, text
+from sqlmodel.ext.asyncio.session import AsyncSession
 from geoalchemy2 import Geography
-from shapely.geometry import mapping
-from ..database.database import get_session
-from ..database.models import Area, PrecinctElectionResultArea
+from ..database.database import admitted_session, get_async_session
+from .conditional import data_versions, not_modified, validator_headers, versions_last_modified
+from .responses import RawJSON, encode_json, encoded_response
+from .single_flight import SingleFlight
+from ..cache.geometry_cache import geometry_cache, GEOMETRY_CACHE_MAX_BYTES
+from ..cache.precinct_index import precinct_index, bounding_box, PRECINCT_INDEX_ENABLED
+from ..cache.tile_cache import tile_cache
+from ..database.derived import AREA_SIMPLIFY_TOLERANCES
+from ..database.models import AREA_COLUMNS, Area, AreaSimplifiedGeometry, PrecinctElectionResultArea
 from haversine import haversine, Unit
-import math
 
 router = APIRouter(prefix="/api")
 log = logging.getLogger(__name__)
 
 MILES_TO_METERS = 1609.34
 
+zipcode_flight = SingleFlight("zipcode")
+
+# Tables whose import version the area/precinct responses' ETags are built from
+AREA_VERSION_TABLES = ["areas"]
+PRECINCT_VERSION_TABLES = ["areas", "precinct_election_result_area"]
+
+# Below this zoom a tile would hold tens of thousands of precincts, so we serve empty tiles
+PRECINCT_TILE_MIN_ZOOM = 6
+PRECINCT_TILE_MAX_ZOOM = 22
+PRECINCT_TILE_LAYER = "precincts"
+
+PRECINCT_TILE_SQL = text(
+    """
+    WITH bounds AS (
+        SELECT ST_TileEnvelope(:z, :x, :y) AS geom
+    ),
+    mvt AS (
+        SELECT
+            ST_AsMVTGeom(ST_Transform(p.geometry, 3857), bounds.geom, 4096, 64, true) AS geom,
+            p.precinct_id,
+            p.state,
+            p.votes_dem,
+            p.votes_rep,
+            p.votes_total,
+            p.pct_dem_lead
+        FROM precinct_election_result_area p, bounds
+        WHERE p.geometry && ST_Transform(bounds.geom, 4326)
+    )
+    SELECT ST_AsMVT(mvt, :layer, 4096, 'geom') FROM mvt
+    """
+)
+
+# Every column except the geometry itself, which is fetched as GeoJSON text
+PRECINCT_COLUMNS = [c for c in PrecinctElectionResultArea.__table__.columns if c.name != "geometry"]
+
+
+def simplify_tolerance(zoom: Optional[int], tolerance: Optional[float]) -> Optional[float]:
+    """
+    Pick the coarsest precomputed tolerance that is no coarser than requested -
+    either directly or as half a pixel of a 256px tile at `zoom`. None means
+    the full-precision geometry.
+    """
+    if tolerance is None and zoom is not None:
+        tolerance = 360 / (256 * 2 ** zoom) / 2
+    if tolerance is None:
+        return None
+
+    candidates = [t for t in AREA_SIMPLIFY_TOLERANCES if t <= tolerance]
+    return max(candidates) if candidates else None
+
+
+def as_geojson(geometry, precision: Optional[int]):
+    """
+    GeoJSON text of a geometry column, rendered by PostGIS (default precision 9 decimals).
+    """
+    return func.ST_AsGeoJSON(geometry, precision if precision is not None else 9)
+
+
+def select_area_geojson(tolerance: Optional[float], precision: Optional[int], *columns):
+    """
+    select(*columns) plus the area geometry as a GeoJSON text `geometry` column,
+    simplified to `tolerance` when given (falling back to the full geometry for
+    areas that haven't been simplified yet).
+    """
+    if tolerance is None:
+        return select(*columns, as_geojson(Area.geometry, precision).label("geometry"))
+
+    return (
+        select(
+            *columns,
+            as_geojson(func.coalesce(AreaSimplifiedGeometry.geometry, Area.geometry), precision).label("geometry")
+        )
+        .select_from(Area)
+        .outerjoin(
+            AreaSimplifiedGeometry,
+            and_(AreaSimplifiedGeometry.area_id == Area.id, AreaSimplifiedGeometry.tolerance == tolerance)
+        )
+    )
+
+
+async def area_validator_headers(request: Request, session: AsyncSession, tables):
+    """
+    The data versions of `tables`, and the ETag/Last-Modified for a response
+    that only changes when they are re-imported.
+    """
+    versions = await data_versions(session, tables)
+    return versions, area_headers(request, versions)
+
+
+def area_headers(request: Request, versions):
+    return validator_headers(request, versions, last_modified=versions_last_modified(versions))
+
+
+async def geometry_body(key, versions, content):
+    """
+    Serialize (and precompress) a geometry response into the geometry cache -
+    just the bytes when the cache is off.
+    """
+    if not GEOMETRY_CACHE_MAX_BYTES:
+        return encode_json(content)
+    return await run_in_threadpool(geometry_cache.put, key, versions, encode_json(content))
+
+
+def send_geometry_body(request: Request, body, headers):
+    """
+    Send a geometry_body() in the best encoding the client accepts.
+    """
+    if isinstance(body, bytes):
+        return Response(content=body, headers=headers, media_type="application/json")
+    return encoded_response(request, body, headers)
+
+
+async def geometry_response(request: Request, key, versions, content, headers):
+    return send_geometry_body(request, await geometry_body(key, versions, content), headers)
+
+
 # Endpoint to fetch a specific ZIP code by zip_code
 @router.get("/zipcodes/{zip_code}")
-def read_zipcode(zip_code: str, session: Session = Depends(get_session)):
+async def read_zipcode(
+        zip_code: str,
+        request: Request,
+        zoom: Optional[int] = Query(None, ge=0, le=24, description="Map zoom level, picks a simplified geometry"),
+        tolerance: Optional[float] = Query(None, gt=0, description="Max simplification tolerance in degrees"),
+        precision: Optional[int] = Query(None, ge=0, le=15, description="Decimal digits of the coordinates"),
+):
     try:
-
         zip_code_area_id = f"ocd-division/country:us/zipcode:{zip_code}"
-        area = session.execute(
-            select(Area)
-            .where(Area.id == zip_code_area_id)
-        ).scalars().one()
-    
-        if not area:
-            raise HTTPException(status_code=404, detail="ZIP code not found")
-        # log.info(f"Zip code: {area}")
-        geom = to_shape(area.geometry)
-        
-        # Return the ZIP code along with geometry in GeoJSON format
-        return {
-            "zip_code": zip_code,
-            "area": area.dict(exclude={"geometry"}),
-            "geometry": mapping(geom),  # Convert geometry to GeoJSON
-            "error": None
-        }
+        simplify = simplify_tolerance(zoom, tolerance)
+        cache_key = ("zipcode", zip_code_area_id, simplify, precision)
+
+        async def load(skip_if_not_modified: bool):
+            """
+            The versions and body - None instead when skip_if_not_modified and
+            this (the leader's) request gets a 304.
+            """
+            async with admitted_session(request) as session:
+                versions = await data_versions(session, AREA_VERSION_TABLES)
+                if skip_if_not_modified and not_modified(request, area_headers(request, versions)) is not None:
+                    return versions, None
+                body = geometry_cache.get(cache_key, versions)
+                if body is not None:
+                    return versions, body
+
+                area = (await session.execute(
+                    select_area_geojson(simplify, precision, *AREA_COLUMNS)
+                    .where(Area.id == zip_code_area_id)
+                )).one()
+
+                if not area:
+                    raise HTTPException(status_code=404, detail="ZIP code not found")
+                # log.info(f"Zip code: {area}")
+
+            # The ZIP code along with geometry in GeoJSON format (as rendered by PostGIS)
+            return versions, await geometry_body(cache_key, versions, {
+                "zip_code": zip_code,
+                "area": {c.name: area._mapping[c.name] for c in AREA_COLUMNS},
+                "geometry": RawJSON(area.geometry),
+                "error": None
+            })
+
+        # Concurrent requests for the same ZIP shape share one admission slot, query and encode
+        versions, body = await zipcode_flight.do(cache_key, partial(load, True))
+        headers = area_headers(request, versions)
+        cached = not_modified(request, headers)
+        if cached is not None:
+            return cached
+        if body is None:
+            # The leader only needed a 304
+            versions, body = await zipcode_flight.do(("body",) + cache_key, partial(load, False))
+            headers = area_headers(request, versions)
+        return send_geometry_body(request, body, headers)
+    except HTTPException:
+        raise
     except:
         log.error(f"Exception occurred: {traceback.format_exc()}")
         return {
@@ -49,26 +206,42 @@ def read_zipcode(zip_code: str, session: Session = Depends(get_session)):
 
 
 @router.get("/areas/{area_id:path}")
-def read_zipcode(area_id: str, session: Session = Depends(get_session)):
+async def read_zipcode(
+        area_id: str,
+        request: Request,
+        zoom: Optional[int] = Query(None, ge=0, le=24, description="Map zoom level, picks a simplified geometry"),
+        tolerance: Optional[float] = Query(None, gt=0, description="Max simplification tolerance in degrees"),
+        precision: Optional[int] = Query(None, ge=0, le=15, description="Decimal digits of the coordinates"),
+        session: AsyncSession = Depends(get_async_session)
+):
     log.info(f"Area id: {area_id}")
     try:
+        versions, headers = await area_validator_headers(request, session, AREA_VERSION_TABLES)
+        cached = not_modified(request, headers)
+        if cached is not None:
+            return cached
+
+        simplify = simplify_tolerance(zoom, tolerance)
+        cache_key = ("area", area_id, simplify, precision)
+        body = geometry_cache.get(cache_key, versions)
+        if body is not None:
+            return encoded_response(request, body, headers)
 
-        area = session.execute(
-            select(Area.id, Area.geometry)
+        area = (await session.execute(
+            select_area_geojson(simplify, precision, Area.id)
             .where(Area.id == area_id)
-        ).one()
+        )).one()
 
         if not area:
             raise HTTPException(status_code=404, detail="Area not found")
-        log.info(f"Area: {area}")
-        geom = to_shape(area.geometry)
+        log.info(f"Area: {area.id}")
 
-        # Return the area id along with geometry in GeoJSON format
-        return {
+        # Return the area id along with geometry in GeoJSON format (as rendered by PostGIS)
+        return await geometry_response(request, cache_key, versions, {
             "area_id": area_id,
-            "geometry": mapping(geom),  # Convert geometry to GeoJSON
+            "geometry": RawJSON(area.geometry),
             "error": None
-        }
+        }, headers)
     except:
         log.error(f"Exception occurred: {traceback.format_exc()}")
         return {
@@ -79,10 +252,12 @@ def read_zipcode(area_id: str, session: Session = Depends(get_session)):
 
 
 @router.get("/precincts/{zip_code}")
-def get_precincts_by_centroid(
+async def get_precincts_by_centroid(
         zip_code: str,
+        request: Request,
         radius_miles: float = 5.0,
-        session: Session = Depends(get_session)
+        precision: Optional[int] = Query(None, ge=0, le=15, description="Decimal digits of the coordinates"),
+        session: AsyncSession = Depends(get_async_session)
 ):
     """
     Return precincts whose centroid is within `radius_miles` miles
@@ -94,11 +269,21 @@ def get_precincts_by_centroid(
         if 100 > radius_miles < 1:
             raise HTTPException(status_code=400, detail="Radius miles must be between 1 and 100")
 
+        versions, headers = await area_validator_headers(request, session, PRECINCT_VERSION_TABLES)
+        cached = not_modified(request, headers)
+        if cached is not None:
+            return cached
+
         # 1) Get the ZIP area
         zip_code_area_id = f"ocd-division/country:us/zipcode:{zip_code}"
-        area = session.execute(
-            select(Area).where(Area.id == zip_code_area_id)
-        ).scalar_one_or_none()
+        cache_key = ("precincts", zip_code_area_id, radius_miles, precision)
+        body = geometry_cache.get(cache_key, versions)
+        if body is not None:
+            return encoded_response(request, body, headers)
+        # Only the centroid - no need to pull the ZIP geometry over the wire
+        area = (await session.execute(
+            select(Area.centroid_lat, Area.centroid_lon).where(Area.id == zip_code_area_id)
+        )).one_or_none()
 
         if not area:
             raise HTTPException(status_code=404, detail="ZIP code not found")
@@ -109,45 +294,54 @@ def get_precincts_by_centroid(
         if lat_zip is None or lon_zip is None:
             raise HTTPException(status_code=400, detail="ZIP code centroid missing lat/lon")
 
-        # 2) Approx bounding box (for better performance)
-        deg_lat = radius_miles / 69.0
-        # cos(latitude) in radians
-        deg_lon = radius_miles / (69.0 * math.cos(math.radians(lat_zip)))
-
-        lat_min = lat_zip - deg_lat
-        lat_max = lat_zip + deg_lat
-        lon_min = lon_zip - deg_lon
-        lon_max = lon_zip + deg_lon
-
-        # 3) Query precincts that are in the bounding box
-        precincts_in_box = (
-            session.query(PrecinctElectionResultArea)
-            .filter(PrecinctElectionResultArea.centroid_lat.between(lat_min, lat_max))
-            .filter(PrecinctElectionResultArea.centroid_lon.between(lon_min, lon_max))
-            .all()
+        precinct_select = select(
+            *PRECINCT_COLUMNS, as_geojson(PrecinctElectionResultArea.geometry, precision).label("geometry")
         )
 
-        # 4) Filter by actual Haversine
+        if PRECINCT_INDEX_ENABLED:
+            # Per-worker centroid index (opt-in) finds the ids, we only fetch the matches
+            precinct_ids = precinct_index.lookup(lat_zip, lon_zip, radius_miles)
+            if precinct_ids is None:
+                precinct_ids = await run_in_threadpool(precinct_index.get, lat_zip, lon_zip, radius_miles)
+
+            precincts = (await session.execute(
+                precinct_select.where(PrecinctElectionResultArea.precinct_id.in_(precinct_ids))
+            )).all()
+        else:
+            # 2) Approx bounding box (for better performance)
+            lat_min, lat_max, lon_min, lon_max = bounding_box(lat_zip, lon_zip, radius_miles)
+
+            # 3) Query precincts that are in the bounding box
+            precincts_in_box = (await session.execute(
+                precinct_select
+                .where(PrecinctElectionResultArea.centroid_lat.between(lat_min, lat_max))
+                .where(PrecinctElectionResultArea.centroid_lon.between(lon_min, lon_max))
+            )).all()
+
+            # 4) Filter by actual Haversine
+            precincts = []
+            for p in precincts_in_box:
+                dist = haversine(
+                    (lat_zip,lon_zip),
+                    (p.centroid_lat,p.centroid_lon),
+                    unit=Unit.MILES
+                )
+                if dist <= radius_miles:
+                    precincts.append(p)
+
         precincts_in_radius = []
-        for p in precincts_in_box:
-            dist = haversine(
-                (lat_zip,lon_zip),
-                (p.centroid_lat,p.centroid_lon),
-                unit=Unit.MILES
-            )
-            if dist <= radius_miles:
-                json_geo = mapping(to_shape(p.geometry))
-                p_dict = p.model_dump()
-                p_dict["geometry"] = json_geo
-                precincts_in_radius.append(p_dict)
+        for p in precincts:
+            p_dict = {c.name: p._mapping[c.name] for c in PRECINCT_COLUMNS}
+            p_dict["geometry"] = RawJSON(p.geometry)
+            precincts_in_radius.append(p_dict)
 
         # 5) Return some or all data
-        return {
+        return await geometry_response(request, cache_key, versions, {
             "zip_code": zip_code,
             "radius_miles": radius_miles,
             "count": len(precincts_in_radius),
             "precincts": precincts_in_radius,
-        }
+        }, headers)
     except HTTPException:
         raise
     except Exception as e:
@@ -156,4 +350,40 @@ def get_precincts_by_centroid(
             "error": str(e),
             "zip_code": zip_code,
             "precincts": []
-        }
\ No newline at end of file
+        }
+
+
+@router.get("/precincts/tiles/{z}/{x}/{y}.mvt")
+async def get_precinct_tile(
+        z: int,
+        x: int,
+        y: int,
+        session: AsyncSession = Depends(get_async_session)
+):
+    """
+    Mapbox Vector Tile of precinct election results (layer "precincts"), rendered
+    by PostGIS and cached on disk.
+    """
+    if not 0 <= z <= PRECINCT_TILE_MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail="Invalid tile coordinates")
+
+    try:
+        tile = await run_in_threadpool(tile_cache.get, PRECINCT_TILE_LAYER, z, x, y)
+        if tile is None:
+            if z < PRECINCT_TILE_MIN_ZOOM:
+                tile = b""
+            else:
+                tile = (await session.execute(
+                    PRECINCT_TILE_SQL, {"z": z, "x": x, "y": y, "layer": PRECINCT_TILE_LAYER}
+                )).scalar()
+                tile = bytes(tile) if tile is not None else b""
+            await run_in_threadpool(tile_cache.put, PRECINCT_TILE_LAYER, z, x, y, tile)
+
+        return Response(
+            content=tile,
+            media_type="application/vnd.mapbox-vector-tile",
+            headers={"Cache-Control": "public, max-age=3600"},
+        )
+    except Exception:
+        log.exception("Error rendering precinct tile")
+        raise HTTPException(status_code=500, detail="Exception occurred rendering precinct tile.")
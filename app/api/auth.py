@@ -0,0 +1,16 @@
+from fastapi import Header, HTTPException
+from typing import Optional
+import os
+
+
+def require_api_key(x_repcheck_api_key: Optional[str] = Header(default=None)):
+    """
+    Dependency for admin/write routes - checks the X-REPCHECK-API-KEY header
+    against the REPCHECK_API_KEY environment variable.
+    """
+    if x_repcheck_api_key is None:
+        raise HTTPException(status_code=401, detail="X-REPCHECK-API-KEY is not set.")
+
+    expected_key = os.getenv("REPCHECK_API_KEY")
+    if not expected_key or x_repcheck_api_key != expected_key:
+        raise HTTPException(status_code=403, detail="Invalid API Key")
@@ -1,31 +1,241 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlmodel import Session, select
-from sqlalchemy import func, desc, asc, or_, text
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import func, desc, asc, or_, and_, tuple_, cast, column, update, values, Text, REAL
+from sqlalchemy.dialects.postgresql import JSONB, REGCONFIG
 from typing import List, Optional, Dict
-from datetime import date
+from datetime import date, datetime
+import base64
 import logging
 import json
 import traceback
+from functools import partial
 from math import ceil
-from ..database.database import get_session
-from ..database.models import BillTable, BillWithVotes, PersonTable, PersonArea, VoteEvent
-from pydantic import BaseModel
-import os
+from ..cache.result_cache import bills_cache
+from ..database.database import admitted_session, get_async_session
+from ..database.derived import SEARCH_CONFIG
+from ..database.models import Bill, BillTable, BillWithVotes, PersonTable, PersonArea, VoteEvent, VoteRecord
+from .auth import require_api_key
+from .conditional import data_versions, not_modified, validator_headers, versions_last_modified
+from .responses import encode_json, json_response, ndjson_response
+from .single_flight import SingleFlight
+from pydantic import BaseModel, Field
 
 router = APIRouter(prefix="/api")
 log = logging.getLogger(__name__)
 
+bills_flight = SingleFlight("bills_first_page")
+
 class PaginatedBills(BaseModel):
-    total_bills: int
-    total_pages: int
-    current_page: int
+    # total_bills/total_pages/current_page are only optional in cursor mode
+    total_bills: Optional[int]
+    total_pages: Optional[int]
+    current_page: Optional[int]
     page_size: int
     bills: List[BillWithVotes]
+    next_cursor: Optional[str] = None
+
+
+SORT_OPTIONS = ["creation_date", "latest_action_date", "latest_vote_date", "title"]
+COUNT_OPTIONS = ["none", "estimate", "exact"]
+# A bills page changes with these tables - the zip -> people -> jurisdiction lookup included
+BILLS_PAGE_VERSION_TABLES = ["people", "person_area", "bills", "vote_events"]
+# Bill detail - the bill row has its own updated_at
+BILL_VERSION_TABLES = ["vote_events"]
+# include=votes attaches full vote events, vote_counts leaves out the per-voter `votes` array
+INCLUDE_OPTIONS = ["votes", "vote_counts", "none"]
+
+# Rows are serialized straight into these, in the response models' field order,
+# instead of building BillWithVotes objects that FastAPI would validate again
+BILL_FIELDS = list(Bill.model_fields)
+VOTE_FIELDS = list(VoteEvent.model_fields)
+BILL_COLUMNS = {c.name: c for c in BillTable.__table__.columns}
+VOTE_COLUMNS = [VoteEvent.__table__.c[name] for name in VOTE_FIELDS]
+
+
+def parse_fields(fields: Optional[List[str]]) -> List[str]:
+    """
+    Bill fields to select for ?fields=title,latest_action_date (or repeated
+    fields=) - always including the id, all of them by default.
+    """
+    if not fields:
+        return BILL_FIELDS
+
+    requested = {f.strip() for value in fields for f in value.split(",") if f.strip()}
+    unknown = requested - set(BILL_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields {sorted(unknown)}")
+    return [name for name in BILL_FIELDS if name in requested or name == "id"]
+
+
+def select_bill_fields(fields: List[str]):
+    return select(*[BILL_COLUMNS[name] for name in fields])
+
+
+async def fetch_votes_by_bill(session: AsyncSession, bill_ids: List[str], include: str = "votes") -> Dict[str, List[Dict]]:
+    """
+    All vote events for these bills as plain dicts, grouped by bill id.
+    """
+    votes_by_bill = {}
+    if not bill_ids or include == "none":
+        return votes_by_bill
+
+    columns = VOTE_COLUMNS if include == "votes" else [c for c in VOTE_COLUMNS if c.name != "votes"]
+    rows = (await session.execute(
+        select(*columns).where(VoteEvent.bill_id.in_(bill_ids))
+    )).all()
+    for row in rows:
+        votes_by_bill.setdefault(row.bill_id, []).append(dict(row._mapping))
+    return votes_by_bill
+
+
+def bill_with_votes_dict(row, votes_by_bill: Dict[str, List[Dict]], fields: List[str] = BILL_FIELDS, include: str = "votes") -> Dict:
+    bill = {name: row._mapping[name] for name in fields}
+    if include != "none":
+        bill["votes"] = votes_by_bill.get(bill["id"], [])
+    return bill
+
+
+async def jurisdiction_area_ids_for_zip(session: AsyncSession, zip_code: str) -> List[str]:
+    """
+    Jurisdictions (e.g. the state and the country) of the people representing a zip code.
+    """
+    area_id = f"ocd-division/country:us/zipcode:{zip_code}"
+
+    # Find person_ids for this zip code
+    person_ids = (
+        await session.exec(
+            select(PersonArea.person_id)
+            .where(PersonArea.area_id == area_id)
+            .distinct()
+        )
+    ).all()
+    log.info(f"Found people {person_ids} for zip code {zip_code}")
+
+    # Find jurisdiction_area_ids for these people
+    jurisdiction_areas = (await session.exec(
+        select(PersonTable.jurisdiction_area_id)
+        .where(PersonTable.id.in_(person_ids))
+        .distinct()
+    )).all()
+    jurisdiction_area_ids = [ja for ja in jurisdiction_areas]
+    log.info(f"Found jurisdiction_area_ids {jurisdiction_area_ids}")
+    return jurisdiction_area_ids
+
+
+def filter_bills(
+    query,
+    has_votes: bool,
+    jurisdiction_level: Optional[str],
+    date_type: Optional[str],
+    start_date: Optional[date],
+    end_date: Optional[date],
+    representative_ids: Optional[List[str]],
+):
+    """
+    The optional filters shared by the bill list and search endpoints.
+    """
+    # Optional filter: bills that have at least one vote (has_votes=True)
+    if has_votes:
+        query = query.where(BillTable.latest_vote_date.is_not(None))
+
+    # Optional filter: jurisdiction_level
+    if jurisdiction_level:
+        query = query.where(BillTable.jurisdiction_level == jurisdiction_level)
+
+    # Optional filter: date range on either creation_date or latest_action_date
+    if date_type in ["latest_action_date", "creation_date"]:
+        if date_type == "latest_action_date":
+            date_column = BillTable.latest_action_date
+        else:
+            date_column = BillTable.created_at
+
+        if start_date:
+            query = query.where(date_column >= start_date)
+        if end_date:
+            query = query.where(date_column <= end_date)
+    else:
+        raise HTTPException(status_code=400, detail="date_type must be 'latest_action_date' or 'creation_date'")
+
+    # Optional filter: one or more representative IDs who have voted on it
+    # We'll do an OR condition so that if a bill has a vote from *any* of the reps, it appears.
+    # vote_records is indexed on (voter_id, bill_id) so this is an index-only lookup.
+    if representative_ids:
+        rep_vote_bill_ids = (
+            select(VoteRecord.bill_id)
+            .where(VoteRecord.voter_id.in_(representative_ids))
+        )
+        query = query.where(BillTable.id.in_(rep_vote_bill_ids))
+
+    return query
+
+
+def encode_cursor(sort_by: str, sort_order: str, value, bill_id: str) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({"s": sort_by, "o": sort_order, "v": value, "id": bill_id})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str, sort_by: str, sort_order: str):
+    """
+    Returns the (sort value, bill id) the previous page ended on.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        value = payload["v"]
+        if value is not None and sort_by not in ("title", "relevance"):
+            value = datetime.fromisoformat(value)
+        bill_id = payload["id"]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+    if payload.get("s") != sort_by or payload.get("o") != sort_order:
+        raise HTTPException(status_code=400, detail="Cursor does not match sort_by/sort_order.")
+    return value, bill_id
+
+
+def keyset_condition(sort_column, sort_order: str, value, bill_id: str):
+    """
+    Rows strictly after (value, bill_id) in ORDER BY sort_column, id.
+    Postgres sorts NULLs first for DESC and last for ASC, so NULL sort values
+    need their own branch.
+    """
+    if sort_order == "desc":
+        if value is None:
+            return or_(and_(sort_column.is_(None), BillTable.id < bill_id), sort_column.is_not(None))
+        return tuple_(sort_column, BillTable.id) < tuple_(value, bill_id)
+
+    if value is None:
+        return and_(sort_column.is_(None), BillTable.id > bill_id)
+    return or_(tuple_(sort_column, BillTable.id) > tuple_(value, bill_id), sort_column.is_(None))
+
+
+def estimate_count(session: Session, query) -> int:
+    """
+    Planner row estimate for a query - much cheaper than count() but approximate.
+    Takes a sync session, so call it through session.run_sync().
+    """
+    compiled = query.compile(
+        dialect=session.get_bind().dialect,
+        compile_kwargs={"render_postcompile": True}
+    )
+    # psycopg2 takes named parameters, asyncpg positional ones
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+    plan = session.connection().exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
 
 @router.get("/zipcodes/{zip_code}/bills", response_model=PaginatedBills)
-def get_bills_for_representatives(
+async def get_bills_for_representatives(
     zip_code: str,
+    request: Request,
     page: int = 1,
     page_size: int = 20,
     has_votes: bool = False,
@@ -43,7 +253,16 @@ def get_bills_for_representatives(
     sort_by: str = "latest_action_date",  # "creation_date", "latest_action_date", "latest_vote_date", "title"
     sort_order: str = "desc",            # "asc" or "desc"
 
-    session: Session = Depends(get_session),
+    # --- Keyset pagination ---
+    # Pass cursor= (empty) for the first page, then the returned next_cursor.
+    cursor: Optional[str] = None,
+    count: Optional[str] = None,  # cursor mode only: "none" (default), "estimate" or "exact"
+
+    # --- Sparse fieldsets ---
+    # Example usage: ?fields=title,latest_action_date,classification&include=vote_counts
+    fields: Optional[List[str]] = Query(default=None),
+    include: str = "votes",  # "votes", "vote_counts" or "none"
+
 ):
     """
     Fetch paginated bills for representatives associated with a given zip code,
@@ -53,11 +272,19 @@ def get_bills_for_representatives(
       - Filter by has_votes (already present).
       - Filter by multiple representative_ids who have voted on the bill.
       - Sort by creation_date, latest_action_date, latest_vote_date, or title.
+
+    With `cursor` set, pages are fetched by keyset (sort column, id) instead of
+    OFFSET, and the total is skipped unless `count` asks for it.
+
+    `fields` limits the bill columns that are selected and returned, and
+    `include` whether vote events are attached in full, without the per-voter
+    votes, or not at all.
+
+    Responses carry an ETag/Last-Modified from the data_versions of the tables
+    involved, and If-None-Match is answered with a 304 before any bill query.
     """
 
     try:
-        area_id = f"ocd-division/country:us/zipcode:{zip_code}"
-
         # Validate pagination
         if page < 1 or page_size < 1:
             raise HTTPException(
@@ -65,149 +292,143 @@ def get_bills_for_representatives(
                 detail="page and page_size must be positive integers."
             )
 
-        # Find person_ids for this zip code
-        person_ids = (
-            session.exec(
-                select(PersonArea.person_id)
-                .where(PersonArea.area_id == area_id)
-                .distinct()
+        bill_fields = parse_fields(fields)
+        if include not in INCLUDE_OPTIONS:
+            raise HTTPException(status_code=400, detail=f"include must be one of {INCLUDE_OPTIONS}")
+
+        use_cursor = cursor is not None
+        if count is not None and (not use_cursor or count not in COUNT_OPTIONS):
+            raise HTTPException(
+                status_code=400,
+                detail=f"count must be one of {COUNT_OPTIONS} and requires cursor."
             )
-            .all()
-        )
-        log.info(f"Found people {person_ids} for zip code {zip_code}")
 
-        # Find jurisdiction_area_ids for these people
-        jurisdiction_areas = session.exec(
-            select(PersonTable.jurisdiction_area_id)
-            .where(PersonTable.id.in_(person_ids))
-            .distinct()
-        ).all()
-        jurisdiction_area_ids = [ja for ja in jurisdiction_areas]
-        log.info(f"Found jurisdiction_area_ids {jurisdiction_area_ids}")
-
-        # Base query: bills for those jurisdiction areas
-        bills_query = select(BillTable).where(BillTable.jurisdiction_area_id.in_(jurisdiction_area_ids))
-
-        # Optional filter: bills that have at least one vote (has_votes=True)
-        if has_votes:
-            subquery_votes = select(VoteEvent.bill_id).distinct()
-            bills_query = bills_query.where(BillTable.id.in_(subquery_votes))
-
-        # Optional filter: jurisdiction_level
-        if jurisdiction_level:
-            bills_query = bills_query.where(BillTable.jurisdiction_level == jurisdiction_level)
-
-        # Optional filter: date range on either creation_date or latest_action_date
-        if date_type in ["latest_action_date", "creation_date"]:
-            if date_type == "latest_action_date":
-                date_column = BillTable.latest_action_date
-            else:
-                date_column = BillTable.created_at
+        # default if an unknown sort_by is passed
+        if sort_by not in SORT_OPTIONS:
+            sort_by = "latest_action_date"
+        if sort_order != "desc":
+            sort_order = "asc"
 
-            if start_date:
-                bills_query = bills_query.where(date_column >= start_date)
-            if end_date:
-                bills_query = bills_query.where(date_column <= end_date)
-        else:
-            raise HTTPException(status_code=400, detail="date_type must be 'latest_action_date' or 'creation_date'")
-
-        # Optional filter: one or more representative IDs who have voted on it
-        # We'll do an OR condition so that if a bill has a vote from *any* of the reps, it appears.
-        if representative_ids:
-            # Build a subquery for bills that any of these reps voted on
-            votes_lateral = func.jsonb_array_elements(VoteEvent.votes).alias("vote_element")
-
-            # Build the conditions for matching representative IDs
-            or_conditions = []
-            for rep_id in representative_ids:
-                condition = json.dumps({"voter_id": rep_id})
-                or_conditions.append(text(f"vote_element @> '{condition}'"))
-
-            # Create the subquery that uses the LATERAL join to filter votes
-            rep_vote_bill_ids = (
-                select(VoteEvent.bill_id)
-                .join(votes_lateral, text("true"))  # Perform LATERAL join
-                .where(or_(*or_conditions))
-                .distinct()
-            )
+        def page_headers(versions):
+            return validator_headers(request, versions, last_modified=versions_last_modified(versions))
 
-            # Restrict bills to those that appear in the subquery
-            bills_query = bills_query.where(BillTable.id.in_(rep_vote_bill_ids))
+        # Same versions as the ETag, so any bill/vote/people write is a cache miss
+        cache_key = (
+            zip_code, page, page_size, has_votes, date_type, start_date, end_date, jurisdiction_level,
+            tuple(sorted(set(representative_ids or []))), sort_by, sort_order, cursor, count,
+            tuple(bill_fields), include,
+        )
 
-        # --- COUNT total for pagination ---
-        total_bill_count = session.exec(
-            select(func.count()).select_from(bills_query.subquery())
-        ).one()
-        log.info(f"Total bill count: {total_bill_count}")
-
-        total_pages = ceil(total_bill_count / page_size)
-        if page > total_pages and total_bill_count > 0:
-            raise HTTPException(status_code=404, detail="Page not found.")
-
-        # --- Sorting logic ---
-        # We'll handle "latest_vote_date" with a subquery that calculates the MAX(VoteEvent.start_date).
-        if sort_by == "latest_vote_date":
-            sub_latest_vote = (
-                select(
-                    VoteEvent.bill_id,
-                    func.max(VoteEvent.start_date).label("max_vote_date")
-                )
-                .group_by(VoteEvent.bill_id)
-                .subquery()
-            )
-            # Outer join so bills with no votes won't be excluded
-            # We then order by the subquery column "max_vote_date"
+        async def load(skip_if_not_modified: bool):
+            """
+            The versions and body - None instead when skip_if_not_modified and
+            this request gets a 304, before any bill query.
+            """
+            async with admitted_session(request) as session:
+                versions = await data_versions(session, BILLS_PAGE_VERSION_TABLES)
+                if skip_if_not_modified and not_modified(request, page_headers(versions)) is not None:
+                    return versions, None
+                body = bills_cache.get(cache_key, versions)
+                if body is None:
+                    body = await build(session, versions)
+                return versions, body
+
+        async def build(session, versions):
+            jurisdiction_area_ids = await jurisdiction_area_ids_for_zip(session, zip_code)
+
+            # Base query: bills for those jurisdiction areas
             bills_query = (
-                bills_query
-                .join(sub_latest_vote, BillTable.id == sub_latest_vote.c.bill_id, isouter=True)
+                select_bill_fields(bill_fields)
+                .where(BillTable.jurisdiction_area_id.in_(jurisdiction_area_ids))
+            )
+            bills_query = filter_bills(
+                bills_query, has_votes, jurisdiction_level, date_type, start_date, end_date, representative_ids
             )
 
-            if sort_order == "desc":
-                bills_query = bills_query.order_by(desc(sub_latest_vote.c.max_vote_date))
-            else:
-                bills_query = bills_query.order_by(asc(sub_latest_vote.c.max_vote_date))
-
-        else:
-            # Simple column-based sorting
-            if sort_by == "creation_date":
+            # --- COUNT total for pagination ---
+            total_bill_count = None
+            total_pages = None
+            if not use_cursor or count == "exact":
+                total_bill_count = (await session.exec(
+                    select(func.count()).select_from(bills_query.subquery())
+                )).one()
+            elif count == "estimate":
+                total_bill_count = await session.run_sync(estimate_count, bills_query)
+            log.info(f"Total bill count: {total_bill_count}")
+
+            if total_bill_count is not None:
+                total_pages = ceil(total_bill_count / page_size)
+            if not use_cursor and page > total_pages and total_bill_count > 0:
+                raise HTTPException(status_code=404, detail="Page not found.")
+
+            # --- Sorting logic ---
+            if sort_by == "latest_vote_date":
+                # Maintained on the bill itself, so this is an index-ordered scan
+                sort_column = BillTable.latest_vote_date
+            elif sort_by == "creation_date":
                 sort_column = BillTable.created_at
-            elif sort_by == "latest_action_date":
-                sort_column = BillTable.latest_action_date
             elif sort_by == "title":
                 sort_column = BillTable.title
             else:
-                # default if an unknown sort_by is passed
                 sort_column = BillTable.latest_action_date
 
+            # Bill id breaks ties so the order (and any cursor) is stable
             if sort_order == "desc":
-                bills_query = bills_query.order_by(desc(sort_column))
+                bills_query = bills_query.order_by(desc(sort_column), desc(BillTable.id))
             else:
-                bills_query = bills_query.order_by(asc(sort_column))
-
-        # --- Pagination ---
-        bills_query = bills_query.offset((page - 1) * page_size).limit(page_size)
-        bills = session.exec(bills_query).all()
-
-        # Retrieve all votes for these bills
-        bill_ids = [bill.id for bill in bills]
-        votes = session.exec(
-            select(VoteEvent).where(VoteEvent.bill_id.in_(bill_ids))
-        ).all()
-
-        # Attach votes
-        bills_with_votes = []
-        for bill in bills:
-            bill_votes = [vote for vote in votes if vote.bill_id == bill.id]
-            bills_with_votes.append(BillWithVotes(**bill.dict(), votes=bill_votes))
-
-        return PaginatedBills(
-            total_bills=total_bill_count,
-            total_pages=total_pages,
-            current_page=page,
-            page_size=page_size,
-            bills=bills_with_votes,
-        )
-
+                bills_query = bills_query.order_by(asc(sort_column), asc(BillTable.id))
+
+            # --- Pagination ---
+            next_cursor = None
+            if use_cursor:
+                if cursor:
+                    value, last_bill_id = decode_cursor(cursor, sort_by, sort_order)
+                    bills_query = bills_query.where(keyset_condition(sort_column, sort_order, value, last_bill_id))
+
+                # Fetch one extra row to know whether there is a next page
+                bills = (await session.execute(
+                    bills_query.add_columns(sort_column.label("sort_value")).limit(page_size + 1)
+                )).all()
+                if len(bills) > page_size:
+                    bills = bills[:page_size]
+                    next_cursor = encode_cursor(sort_by, sort_order, bills[-1].sort_value, bills[-1].id)
+            else:
+                bills_query = bills_query.offset((page - 1) * page_size).limit(page_size)
+                bills = (await session.execute(bills_query)).all()
+
+            # Retrieve all votes for these bills
+            votes_by_bill = await fetch_votes_by_bill(session, [bill.id for bill in bills], include)
+
+            # Same shape as PaginatedBills, serialized directly
+            body = encode_json({
+                "total_bills": total_bill_count,
+                "total_pages": total_pages,
+                "current_page": None if use_cursor else page,
+                "page_size": page_size,
+                "bills": [bill_with_votes_dict(bill, votes_by_bill, bill_fields, include) for bill in bills],
+                "next_cursor": next_cursor,
+            })
+            bills_cache.put(cache_key, versions, body)
+            return body
+
+        if page == 1 and not cursor:
+            # The first page is what every visitor of a zip code loads - concurrent
+            # requests share one admission slot and set of queries (and one encode)
+            versions, body = await bills_flight.do(cache_key, partial(load, True))
+        else:
+            versions, body = await load(True)
+        headers = page_headers(versions)
+        cached = not_modified(request, headers)
+        if cached is not None:
+            return cached
+        if body is None:
+            # The leader only needed a 304
+            versions, body = await bills_flight.do(("body",) + cache_key, partial(load, False))
+            headers = page_headers(versions)
+        return Response(content=body, headers=headers, media_type="application/json")
+
+    except HTTPException:
+        raise
     except Exception as e:
         log.exception(e)
         log.error(traceback.format_exc())
@@ -216,24 +437,159 @@ def get_bills_for_representatives(
             detail="Exception occurred when fetching bills for representatives."
         )
 
+class BillSearchResults(BaseModel):
+    page_size: int
+    bills: List[BillWithVotes]
+    next_cursor: Optional[str] = None
+
+
+@router.get("/bills/search", response_model=BillSearchResults)
+async def search_bills(
+    q: str = Query(..., min_length=1, description="Search terms - quotes, OR and -exclusions work like a web search"),
+    zip_code: Optional[str] = None,
+    jurisdiction_area_id: Optional[List[str]] = Query(default=None),
+    page_size: int = Query(20, ge=1, le=100),
+    has_votes: bool = False,
+    date_type: str = "latest_action_date",  # or "creation_date"
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    jurisdiction_level: Optional[str] = None,
+    representative_ids: Optional[List[str]] = Query(default=None),
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = Query(default=None),
+    include: str = "none",  # "votes", "vote_counts" or "none"
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Full-text search over bill titles, other titles, subjects, abstracts and AI
+    summaries, best matches first. Takes the same filters as
+    /api/zipcodes/{zip_code}/bills, with the zip code (or jurisdiction_area_id)
+    optional, and pages by cursor: pass the returned next_cursor to continue.
+    """
+    try:
+        bill_fields = parse_fields(fields)
+        if include not in INCLUDE_OPTIONS:
+            raise HTTPException(status_code=400, detail=f"include must be one of {INCLUDE_OPTIONS}")
+
+        ts_query = func.websearch_to_tsquery(cast(SEARCH_CONFIG, REGCONFIG), q)
+        # Normalization 32 (rank / (rank + 1)) keeps long bills from drowning out short ones
+        rank = func.ts_rank_cd(BillTable.search_vector, ts_query, 32)
+
+        query = select_bill_fields(bill_fields).add_columns(rank.label("sort_value"))
+        query = query.where(BillTable.search_vector.op("@@")(ts_query))
+
+        jurisdiction_area_ids = list(jurisdiction_area_id or [])
+        if zip_code:
+            jurisdiction_area_ids += await jurisdiction_area_ids_for_zip(session, zip_code)
+        if zip_code or jurisdiction_area_ids:
+            query = query.where(BillTable.jurisdiction_area_id.in_(jurisdiction_area_ids))
+
+        query = filter_bills(
+            query, has_votes, jurisdiction_level, date_type, start_date, end_date, representative_ids
+        )
+
+        if cursor:
+            value, last_bill_id = decode_cursor(cursor, "relevance", "desc")
+            # ts_rank_cd returns a real - compare as one so the cursor row itself is excluded
+            query = query.where(tuple_(rank, BillTable.id) < tuple_(cast(value, REAL), last_bill_id))
+
+        # Fetch one extra row to know whether there is a next page
+        bills = (await session.execute(
+            query.order_by(desc(rank), desc(BillTable.id)).limit(page_size + 1)
+        )).all()
+        next_cursor = None
+        if len(bills) > page_size:
+            bills = bills[:page_size]
+            next_cursor = encode_cursor("relevance", "desc", bills[-1].sort_value, bills[-1].id)
+
+        votes_by_bill = await fetch_votes_by_bill(session, [bill.id for bill in bills], include)
+
+        return json_response({
+            "page_size": page_size,
+            "bills": [bill_with_votes_dict(bill, votes_by_bill, bill_fields, include) for bill in bills],
+            "next_cursor": next_cursor,
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.exception(e)
+        log.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail="Exception occurred when searching bills.")
+
+
 @router.get("/bills", response_model=BillWithVotes)
-def get_bill(bill_id: str,  session: Session = Depends(get_session)):
+async def get_bill(
+    bill_id: str,
+    request: Request,
+    fields: Optional[List[str]] = Query(default=None),
+    include: str = "votes",  # "votes", "vote_counts" or "none"
+    session: AsyncSession = Depends(get_async_session)
+):
     try:
-        bill = session.exec(select(BillTable).where(BillTable.id == bill_id)).one_or_none()
+        bill_fields = parse_fields(fields)
+        if include not in INCLUDE_OPTIONS:
+            raise HTTPException(status_code=400, detail=f"include must be one of {INCLUDE_OPTIONS}")
+
+        # Validators from when the bill row was last written (set_bill_summaries
+        # bumps updated_at too, and ai_summary is hashed in for good measure) plus
+        # the vote_events data version - vote dates don't move when counts change
+        validators = (await session.execute(
+            select(BillTable.updated_at, func.md5(BillTable.ai_summary))
+            .where(BillTable.id == bill_id)
+        )).one_or_none()
+        headers = None
+        if validators is not None:
+            updated_at, _ = validators
+            versions = await data_versions(session, BILL_VERSION_TABLES)
+            last_modified = max(
+                (d for d in (updated_at, versions_last_modified(versions)) if d is not None), default=None
+            )
+            headers = validator_headers(request, *validators, versions, last_modified=last_modified)
+            cached = not_modified(request, headers)
+            if cached is not None:
+                return cached
 
-        votes = session.exec(select(VoteEvent).where(VoteEvent.bill_id == bill.id)).all()
-        bill_with_votes = BillWithVotes(**bill.dict(), votes=votes)
+        bill = (await session.execute(
+            select_bill_fields(bill_fields).where(BillTable.id == bill_id)
+        )).one_or_none()
+
+        votes_by_bill = await fetch_votes_by_bill(session, [bill.id], include)
+        bill_with_votes = bill_with_votes_dict(bill, votes_by_bill, bill_fields, include)
 
         # if not bill:
         #     raise HTTPException(status_code=404, detail="Bill not found")
 
-        return bill_with_votes
+        return json_response(bill_with_votes, headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         log.exception(e)
         log.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail="Exception occurred when fetching bill.")
 
 
+@router.get("/bills/votes", response_model=List[VoteRecord])
+async def get_representative_votes(
+    representative_ids: List[str] = Query(...),
+    bill_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    How did these representatives vote - optionally on a single bill.
+    """
+    try:
+        query = select(VoteRecord).where(VoteRecord.voter_id.in_(representative_ids))
+        if bill_id:
+            query = query.where(VoteRecord.bill_id == bill_id)
+
+        return (await session.exec(query.limit(limit))).all()
+    except Exception as e:
+        log.exception(e)
+        log.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail="Exception occurred when fetching votes.")
+
+
 class BillSummaryUpdateResponse(BaseModel):
     success: bool
 
@@ -242,29 +598,55 @@ class BillSummaryUpdateRequest(BaseModel):
     bill_id: str
     summary: str
 
-@router.post("/bills/summary", response_model=BillSummaryUpdateResponse)
-def update_bill_summary(data: BillSummaryUpdateRequest, request:Request, session: Session = Depends(get_session)):
-    try:
 
+# Summaries per POST /api/bills/summaries - two bind parameters each
+MAX_SUMMARY_BATCH_SIZE = 5000
+
+
+class BillSummariesUpdateRequest(BaseModel):
+    summaries: List[BillSummaryUpdateRequest] = Field(..., min_length=1, max_length=MAX_SUMMARY_BATCH_SIZE)
+
+
+class BillSummaryResult(BaseModel):
+    bill_id: str
+    updated: bool
 
-        headers_dict = dict(request.headers)
-        log.info(headers_dict)
 
-        if "x-repcheck-api-key" not in headers_dict:
-            raise HTTPException(status_code=401, detail="X-REPCHECK-API-KEY is not set.")
+class BillSummariesUpdateResponse(BaseModel):
+    updated: int
+    not_found: int
+    results: List[BillSummaryResult]
 
-        api_key_sent = headers_dict.get("x-repcheck-api-key")
-        expected_key = os.getenv("REPCHECK_API_KEY")
-        if api_key_sent != expected_key:
-            raise HTTPException(status_code=403, detail="Invalid API Key")
 
-        bill = session.exec(select(BillTable).where(BillTable.id == data.bill_id)).one_or_none()
+async def set_bill_summaries(session: AsyncSession, summaries: Dict[str, str]) -> set:
+    """
+    Set ai_summary for many bills in one UPDATE ... FROM (VALUES ...) statement,
+    without loading the rows. Returns the ids that exist (and were updated).
+    """
+    summary_values = (
+        values(column("bill_id", Text), column("summary", Text), name="v")
+        .data(list(summaries.items()))
+    )
+    updated = (await session.execute(
+        update(BillTable)
+        .where(BillTable.id == summary_values.c.bill_id)
+        .values(ai_summary=summary_values.c.summary, updated_at=func.timezone("utc", func.now()))
+        .returning(BillTable.id)
+    )).scalars().all()
+    await session.commit()
+    # Other workers see the bumped bills data version on their next lookup
+    bills_cache.invalidate()
+    return set(updated)
+
+
+@router.post("/bills/summary", response_model=BillSummaryUpdateResponse, dependencies=[Depends(require_api_key)])
+async def update_bill_summary(data: BillSummaryUpdateRequest, session: AsyncSession = Depends(get_async_session)):
+    try:
+        updated = await set_bill_summaries(session, {data.bill_id: data.summary})
 
-        if not bill:
+        if not updated:
             raise HTTPException(status_code=404, detail="Bill not found.")
 
-        bill.ai_summary = data.summary
-        session.commit()
         return BillSummaryUpdateResponse(
             success=True
         )
@@ -277,6 +659,29 @@ def update_bill_summary(data: BillSummaryUpdateRequest, request:Request, session
         raise HTTPException(status_code=404, detail="Exception occurred when updating summary")
 
 
+@router.post("/bills/summaries", response_model=BillSummariesUpdateResponse, dependencies=[Depends(require_api_key)])
+async def update_bill_summaries(data: BillSummariesUpdateRequest, session: AsyncSession = Depends(get_async_session)):
+    """
+    Set the AI summary of many bills at once, in a single statement. Bills that
+    don't exist are reported with updated=false; if a bill_id is repeated the
+    last summary wins.
+    """
+    try:
+        summaries = {s.bill_id: s.summary for s in data.summaries}
+        updated = await set_bill_summaries(session, summaries)
+        log.info(f"Updated {len(updated)} of {len(summaries)} bill summaries")
+
+        return BillSummariesUpdateResponse(
+            updated=len(updated),
+            not_found=len(summaries) - len(updated),
+            results=[BillSummaryResult(bill_id=bill_id, updated=bill_id in updated) for bill_id in summaries],
+        )
+    except Exception as e:
+        log.exception(e)
+        log.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail="Exception occurred when updating summaries")
+
+
 
 # Pydantic model for the response
 class BillVersions(BaseModel):
@@ -290,10 +695,10 @@ class PaginatedBillSummaries(BaseModel):
     bills: List[BillVersions]
 
 @router.get("/bills/versions", response_model=PaginatedBillSummaries)
-def get_bill_summaries(
+async def get_bill_summaries(
     page: int = Query(1, ge=1, description="The page number to retrieve"),
     per_page: int = Query(10, ge=1, le=100, description="Number of bills per page"),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     try:
         # Calculate offset
@@ -302,23 +707,22 @@ def get_bill_summaries(
         # Query the database
         # Count total rows
         total = (
-            session.exec(
+            await session.exec(
                 select(func.count())
                 .select_from(BillTable)
                 .where(BillTable.jurisdiction_area_id == "ocd-division/country:us")
-            ).one()
-        )
+            )
+        ).one()
         log.info(total)
         bills = (
-            session.exec(
+            await session.exec(
                 select(BillTable.id, BillTable.versions)
                 .where(BillTable.jurisdiction_area_id == "ocd-division/country:us")
                 .order_by(BillTable.id)
                 .offset(offset)
                 .limit(per_page)
             )
-            .fetchall()
-        )
+        ).fetchall()
 
         # Format response
         result = PaginatedBillSummaries(
@@ -332,3 +736,54 @@ def get_bill_summaries(
         # Log the exception
         print(f"Error fetching bill summaries: {e}")
         raise HTTPException(status_code=500, detail="An error occurred while fetching bill summaries.")
+
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 500
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _bills_ndjson(query):
+    """
+    Reads through a server-side cursor so memory stays flat.
+    """
+    def chunks(session):
+        result = session.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for rows in result.partitions():
+            yield "".join(
+                json.dumps(row._asdict(), default=_json_default) + "\n" for row in rows
+            ).encode("utf-8")
+    return chunks
+
+
+@router.get("/bills/versions/export")
+async def export_bill_versions(
+    since: Optional[datetime] = Query(None, description="Only bills with updated_at after this"),
+    fields: Optional[List[str]] = Query(None, description="Extra bill columns to include"),
+    jurisdiction_area_id: str = "ocd-division/country:us",
+):
+    """
+    Stream every bill as newline-delimited JSON ({"id", "versions", ...fields}),
+    ordered by id, in a single response.
+    """
+    unknown_fields = set(fields or []) - set(BILL_COLUMNS)
+    if unknown_fields:
+        raise HTTPException(status_code=400, detail=f"Unknown fields {sorted(unknown_fields)}")
+
+    columns = [BillTable.id, BillTable.versions]
+    columns += [BILL_COLUMNS[f] for f in fields or [] if f not in ("id", "versions")]
+
+    query = (
+        select(*columns)
+        .where(BillTable.jurisdiction_area_id == jurisdiction_area_id)
+        .order_by(BillTable.id)
+    )
+    if since:
+        query = query.where(BillTable.updated_at > since)
+
+    return ndjson_response(_bills_ndjson(query), "bill export")
@@ -0,0 +1,80 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple
+import hashlib
+
+from fastapi import Request, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..database.models import DataVersion
+
+
+async def data_versions(session: AsyncSession, names: List[str]) -> Dict[str, Tuple[int, Optional[datetime]]]:
+    """
+    (version, modified_at) of each named table from data_versions - a primary
+    key lookup, so it's cheap enough to do before any real work.
+    """
+    rows = (await session.execute(
+        select(DataVersion.name, DataVersion.version, DataVersion.modified_at)
+        .where(DataVersion.name.in_(names))
+    )).all()
+    versions = {name: (0, None) for name in names}
+    versions.update({row.name: (row.version, row.modified_at) for row in rows})
+    return versions
+
+
+def _utc(value: datetime) -> datetime:
+    # Our timestamps are stored without a time zone, in UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def validator_headers(request: Request, *parts, last_modified: Optional[datetime] = None) -> Dict[str, str]:
+    """
+    ETag (and Last-Modified) headers for a response that only depends on the
+    request's path and query string plus `parts` (versions, timestamps...).
+
+    The ETag is weak, so it still matches when a proxy re-encodes the body.
+    """
+    query = sorted(request.query_params.multi_items())
+    digest = hashlib.sha1(repr((request.url.path, query, parts)).encode()).hexdigest()
+    headers = {"ETag": f'W/"{digest[:32]}"'}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_utc(last_modified).replace(microsecond=0), usegmt=True)
+    return headers
+
+
+def versions_last_modified(versions: Dict[str, Tuple[int, Optional[datetime]]]) -> Optional[datetime]:
+    return max((modified_at for _, modified_at in versions.values() if modified_at is not None), default=None)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison - W/"x" and "x" are the same entity tag here
+    etag = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def not_modified(request: Request, headers: Dict[str, str]) -> Optional[Response]:
+    """
+    A 304 response if the client's If-None-Match (or, without one,
+    If-Modified-Since) says its copy is current - otherwise None.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        return None
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and "Last-Modified" in headers:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return None
+        if parsedate_to_datetime(headers["Last-Modified"]) <= _utc(since):
+            return Response(status_code=304, headers=headers)
+    return None
@@ -1,60 +1,84 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from sqlalchemy import text
 from sqlmodel import Session, select
-from typing import List
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Dict, List
+from datetime import datetime
 import logging
 import traceback
 
-from ..database.database import get_session
+from ..database.database import admitted_session, get_async_session
 from ..database.models import Area, Person, PersonTable, PersonWithAreas, PersonArea
+from ..cache.zip_index import people_by_zip, zip_index, ZIP_INDEX_ENABLED
+from .responses import encode_json, ndjson_response
+from .single_flight import SingleFlight
 
 router = APIRouter(prefix="/api")
 log = logging.getLogger(__name__)
 
+people_flight = SingleFlight("people_by_zip")
+
 @router.get("/people/{zip_code}", response_model=List[PersonWithAreas])
-def get_representatives_by_zip(zip_code: str, session: Session = Depends(get_session)):
+async def get_representatives_by_zip(zip_code: str, request: Request):
     try:
 
-        area_id = f"ocd-division/country:us/zipcode:{zip_code}"
+        # Precomputed per-worker index (opt-in) - no queries once it's loaded
+        if ZIP_INDEX_ENABLED:
+            people_with_areas = zip_index.lookup(zip_code)
+            if people_with_areas is None:
+                people_with_areas = await run_in_threadpool(zip_index.get, zip_code)
+            return people_with_areas
 
-        # Fetch person IDs for people associated with the zip code
-        person_ids = (
-            session.exec(
-                select(PersonArea.person_id)
-                .where(PersonArea.area_id == area_id)
-                .distinct()
-            )
-            .all()
-        )
+        async def build():
+            async with admitted_session(request) as session:
+                area_id = f"ocd-division/country:us/zipcode:{zip_code}"
+
+                # Fetch person IDs for people associated with the zip code
+                person_ids = (
+                    await session.exec(
+                        select(PersonArea.person_id)
+                        .where(PersonArea.area_id == area_id)
+                        .distinct()
+                    )
+                ).all()
+
+                log.info(f"Found person IDs {person_ids} for zipcode {zip_code}")
+
+                # Fetch Person records for those person_ids
+                people = (await session.exec(
+                    select(PersonTable)
+                    .where(PersonTable.id.in_(person_ids))
+                )).all()
+
+                area_ids = set([])
+                people_with_areas = []
+                for p in people:
+                    people_with_areas.append(PersonWithAreas(**p.dict()))
+                    area_ids.add(p.constituent_area_id)
+                    area_ids.add(p.jurisdiction_area_id)
+
+                areas = (await session.exec(
+                    select(Area)
+                    .where(Area.id.in_(area_ids))
+                )).all()
 
-        log.info(f"Found person IDs {person_ids} for zipcode {zip_code}")
-
-        # Fetch Person records for those person_ids
-        people = session.exec(
-            select(PersonTable)
-            .where(PersonTable.id.in_(person_ids))
-        ).all()
-
-        area_ids = set([])
-        people_with_areas = []
-        for p in people:
-            people_with_areas.append(PersonWithAreas(**p.dict()))
-            area_ids.add(p.constituent_area_id)
-            area_ids.add(p.jurisdiction_area_id)
-
-        areas = session.exec(
-            select(Area)
-            .where(Area.id.in_(area_ids))
-        ).all()
-
-        # Tag them onto the objects
-        for p_with_area in people_with_areas:
-            for area in areas:
-                if p_with_area.constituent_area_id == area.id:
-                    p_with_area.constituent_area = area.dict(exclude={"geometry"})
-                if p_with_area.jurisdiction_area_id == area.id:
-                    p_with_area.jurisdiction_area = area.dict(exclude={"geometry"})
-
-        return people_with_areas
+                # Tag them onto the objects
+                for p_with_area in people_with_areas:
+                    for area in areas:
+                        if p_with_area.constituent_area_id == area.id:
+                            p_with_area.constituent_area = area.dict(exclude={"geometry"})
+                        if p_with_area.jurisdiction_area_id == area.id:
+                            p_with_area.jurisdiction_area = area.dict(exclude={"geometry"})
+
+            return encode_json([p.model_dump() for p in people_with_areas])
+
+        # Concurrent requests for the same zip code share one admission slot, set of queries and encode
+        body = await people_flight.do(zip_code, build)
+        return Response(content=body, media_type="application/json")
+    except HTTPException:
+        raise
     except Exception:
         log.error(f"Exception occurred: {traceback.format_exc()}")
         raise HTTPException(
@@ -64,9 +88,9 @@ def get_representatives_by_zip(zip_code: str, session: Session = Depends(get_ses
 
 
 @router.post("/people", response_model=List[Person])
-def get_representatives(ids: List[str], session: Session = Depends(get_session)):
+async def get_representatives(ids: List[str], session: AsyncSession = Depends(get_async_session)):
     try:
-        people = session.exec(select(PersonTable).where(PersonTable.id.in_(ids))).all()
+        people = (await session.exec(select(PersonTable).where(PersonTable.id.in_(ids)))).all()
 
         return people
     except Exception:
@@ -74,4 +98,94 @@ def get_representatives(ids: List[str], session: Session = Depends(get_session))
         raise HTTPException(
             status_code=500,
             detail="An error occurred while fetching representatives.",
-        )
\ No newline at end of file
+        )
+
+
+# POST /api/people/batch bounds - ZIPs per request, and per set of queries
+BATCH_MAX_ZIP_CODES = 10_000
+BATCH_CHUNK_SIZE = 500
+
+# The newest bills of each jurisdiction in one statement, same order as the
+# default /api/zipcodes/{zip_code}/bills page
+LATEST_BILL_IDS_SQL = text(
+    """
+    SELECT j.area_id AS jurisdiction_area_id, b.id, b.latest_action_date
+    FROM unnest(CAST(:area_ids AS text[])) AS j(area_id)
+    CROSS JOIN LATERAL (
+        SELECT id, latest_action_date
+        FROM bills
+        WHERE bills.jurisdiction_area_id = j.area_id
+        ORDER BY latest_action_date DESC, id DESC
+        LIMIT :limit
+    ) b
+    """
+)
+
+
+class ZipBatchRequest(BaseModel):
+    zip_codes: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_ZIP_CODES)
+    include_bill_ids: bool = False
+    bill_ids_limit: int = Field(100, ge=1, le=1000)
+
+
+def _newest_first(row):
+    # ORDER BY latest_action_date DESC, id DESC - where Postgres puts NULLs first
+    return (row.latest_action_date is None, row.latest_action_date or datetime.min, row.id)
+
+
+def bill_ids_by_zip(session: Session, people: Dict[str, List[Dict]], limit: int) -> Dict[str, List[str]]:
+    """
+    Ids of the `limit` newest bills in the jurisdictions of each zip code's
+    representatives, in one query for the whole batch.
+    """
+    jurisdictions = {z: {p["jurisdiction_area_id"] for p in reps} for z, reps in people.items()}
+    area_ids = sorted(set().union(*jurisdictions.values()))
+
+    bills_by_jurisdiction = {}
+    if area_ids:
+        for row in session.execute(LATEST_BILL_IDS_SQL, {"area_ids": area_ids, "limit": limit}):
+            bills_by_jurisdiction.setdefault(row.jurisdiction_area_id, []).append(row)
+
+    by_zip = {}
+    for z, zip_jurisdictions in jurisdictions.items():
+        rows = [row for area_id in zip_jurisdictions for row in bills_by_jurisdiction.get(area_id, [])]
+        rows.sort(key=_newest_first, reverse=True)
+        by_zip[z] = [row.id for row in rows[:limit]]
+    return by_zip
+
+
+def _zip_batch_ndjson(zip_codes: List[str], include_bill_ids: bool, bill_ids_limit: int):
+    """
+    One chunk of zip codes at a time.
+    """
+    def chunks(session):
+        for start in range(0, len(zip_codes), BATCH_CHUNK_SIZE):
+            chunk = zip_codes[start:start + BATCH_CHUNK_SIZE]
+            if ZIP_INDEX_ENABLED:
+                people = {z: zip_index.get(z) for z in chunk}
+            else:
+                people = people_by_zip(session, chunk)
+            people = {z: [p.model_dump() for p in reps] for z, reps in people.items()}
+            bill_ids = bill_ids_by_zip(session, people, bill_ids_limit) if include_bill_ids else None
+
+            lines = []
+            for z in chunk:
+                line = {"zip_code": z, "people": people[z]}
+                if bill_ids is not None:
+                    line["bill_ids"] = bill_ids[z]
+                lines.append(encode_json(line))
+            yield b"\n".join(lines) + b"\n"
+    return chunks
+
+
+@router.post("/people/batch")
+async def get_representatives_by_zip_batch(data: ZipBatchRequest):
+    """
+    Representatives (and optionally the newest bill ids) for many zip codes at
+    once, streamed as newline-delimited JSON - one
+    {"zip_code", "people", ["bill_ids"]} line per distinct zip code, in request order.
+    """
+    zip_codes = list(dict.fromkeys(data.zip_codes))
+    return ndjson_response(
+        _zip_batch_ndjson(zip_codes, data.include_bill_ids, data.bill_ids_limit), "zip code batch"
+    )
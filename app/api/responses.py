@@ -0,0 +1,108 @@
+from typing import Callable, Iterator
+import logging
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+import orjson
+
+from ..database.database import get_engine
+
+log = logging.getLogger(__name__)
+
+
+class RawJSON:
+    """
+    Text that is already valid JSON (e.g. ST_AsGeoJSON output) - json_response()
+    splices it into the body as-is instead of parsing and re-encoding it.
+    """
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+def _default(value):
+    # Only called for types orjson doesn't handle natively
+    if isinstance(value, RawJSON):
+        return orjson.Fragment(value.text) if value.text is not None else None
+    return jsonable_encoder(value)
+
+
+def encode_json(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def json_response(content, status_code: int = 200, headers: dict = None) -> Response:
+    """
+    JSON response encoded with orjson, understanding RawJSON values.
+
+    Returning a Response from a route skips FastAPI's response_model validation
+    and serialization, but the response_model still documents the schema - so
+    use it for payloads that are already in the declared shape.
+    """
+    return Response(
+        content=encode_json(content),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
+
+
+def accepted_encodings(accept_encoding: str) -> dict:
+    """
+    {coding: q} from an Accept-Encoding header.
+    """
+    encodings = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[coding.strip().lower()] = q
+    return encodings
+
+
+def encoded_response(request: Request, body, headers: dict = None) -> Response:
+    """
+    JSON response from a precompressed body (see cache.geometry_cache.EncodedBody),
+    sending brotli or gzip when the client accepts it.
+    """
+    accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+    headers = dict(headers or {}, Vary="Accept-Encoding")
+
+    content = body.identity
+    for coding in ("br", "gzip"):
+        encoded = getattr(body, coding)
+        if encoded is not None and accepted.get(coding, accepted.get("*", 0)) > 0:
+            content = encoded
+            headers["Content-Encoding"] = coding
+            break
+
+    return Response(content=content, headers=headers, media_type="application/json")
+
+
+def ndjson_response(chunks: Callable[[Session], Iterator[bytes]], description: str) -> StreamingResponse:
+    """
+    Newline-delimited JSON streamed from chunks(session), which yields encoded
+    lines a batch at a time. It runs on the threadpool (StreamingResponse iterates
+    sync generators there) with its own session on the sync engine, outside
+    admission control.
+    """
+    def stream():
+        try:
+            with Session(get_engine()) as session:
+                yield from chunks(session)
+        except Exception:
+            # Headers are already sent - log and drop the connection so the client sees a truncated stream
+            log.exception(f"Error streaming {description}")
+            raise
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
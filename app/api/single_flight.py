@@ -0,0 +1,102 @@
+"""
+Single-flight request coalescing: concurrent calls with the same key share
+one computation. The first caller (the leader) runs it; everyone arriving while
+it's in flight awaits the same result - for the hot read routes that's the
+serialized body, so N identical requests cost one set of queries and one
+encode. Nothing is kept once it's done, that's what the caches are for.
+
+The routes using it open their session (database.admitted_session) inside
+the shared computation, so only the leader takes an admission slot and a
+connection - a flash crowd of identical requests costs one of each, whether
+the session underneath is the sync engine on the threadpool or asyncpg.
+"""
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+import asyncio
+import logging
+import os
+
+from .. import metrics
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _LeaderGone(Exception):
+    """
+    The leader was cancelled before finishing - a follower takes over.
+    """
+
+
+class SingleFlight:
+    """
+    Per worker, on its event loop - call do() from async code only.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.followers = 0
+        _flights.append(self)
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[T]],
+    ) -> T:
+        """
+        fn()'s result, shared with concurrent calls for `key`.
+        """
+        while True:
+            future = self._calls.get(key)
+            if future is None:
+                break
+            self.followers += 1
+            try:
+                # shield - a follower giving up mustn't cancel the others' result
+                return await asyncio.shield(future)
+            except _LeaderGone:
+                continue
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self.leaders += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderGone())
+            future.exception()  # retrieved - no "never retrieved" warning without followers
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+_flights = []
+
+
+def _metric_lines():
+    pid = os.getpid()
+    yield "# HELP repcheck_single_flight_calls_total Coalesced calls, by role - followers reused a leader's result."
+    yield "# TYPE repcheck_single_flight_calls_total counter"
+    for flight in _flights:
+        yield f'repcheck_single_flight_calls_total{{pid="{pid}",name="{flight.name}",role="leader"}} {flight.leaders}'
+        yield f'repcheck_single_flight_calls_total{{pid="{pid}",name="{flight.name}",role="follower"}} {flight.followers}'
+    yield "# HELP repcheck_single_flight_in_flight Distinct computations in flight."
+    yield "# TYPE repcheck_single_flight_in_flight gauge"
+    for flight in _flights:
+        yield f'repcheck_single_flight_in_flight{{pid="{pid}",name="{flight.name}"}} {flight.in_flight}'
+
+
+metrics.registry.collectors.append(_metric_lines)
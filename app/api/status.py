@@ -1,10 +1,102 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Query, Response
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+import asyncio
 import logging
+import os
+
+from .auth import require_api_key
+from .responses import json_response
+from .. import cache, diagnostics, metrics, warmup
+from ..database.database import check_database, db_admission, get_async_engine, pool_status
 
 router = APIRouter(prefix="/api")
 log = logging.getLogger(__name__)
 
+# A readiness probe that hangs is as bad as one that fails
+READINESS_TIMEOUT = float(os.getenv("REPCHECK_READINESS_TIMEOUT", "2"))
+
 
 @router.get("/status/health")
 async def get_status():
+    # Liveness only - the process is up. See /status/ready for the database.
     return {"status": "running"}
+
+
+@router.get("/status/ready")
+async def get_readiness():
+    """
+    Readiness: 200 once the database answers and the warm-up is done, 503
+    otherwise - with the pool's state and which caches/indexes are loaded.
+    """
+    database = {"ok": False}
+    try:
+        latency = await asyncio.wait_for(run_in_threadpool(check_database), timeout=READINESS_TIMEOUT)
+        database = {"ok": True, "latency_ms": round(latency * 1000, 3)}
+    except asyncio.TimeoutError:
+        database["error"] = f"No answer within {READINESS_TIMEOUT}s"
+    except Exception as e:
+        log.warning(f"Readiness check failed: {e}")
+        database["error"] = str(e)
+
+    pools = {"sync": pool_status()}
+    async_engine = get_async_engine()
+    if async_engine is not None:
+        pools["async"] = pool_status(async_engine.sync_engine)
+
+    ready = database["ok"] and warmup.state["warmed"]
+    return json_response({
+        "ready": ready,
+        "database": database,
+        "pools": pools,
+        "admission": db_admission.stats(),
+        "warmup": dict(warmup.state),
+        "caches": {name: c.loaded for name, c in cache.registered().items()},
+    }, status_code=200 if ready else 503)
+
+
+@router.get("/status/metrics")
+async def get_metrics():
+    """
+    Per-route latency histograms, SQL statement counts, DB time, rows and pool
+    checkout wait for this worker, in the Prometheus text format.
+    """
+    return Response(content=metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get("/status/caches")
+async def get_caches():
+    """
+    Which caches are loaded, plus hit/miss counters etc. for those that keep them.
+    """
+    caches = {}
+    for name, c in cache.registered().items():
+        caches[name] = {"loaded": c.loaded}
+        if hasattr(c, "stats"):
+            caches[name].update(c.stats())
+    return caches
+
+
+@router.post("/status/caches/invalidate", dependencies=[Depends(require_api_key)])
+async def invalidate_caches(names: Optional[List[str]] = Query(default=None)):
+    """
+    Drop this worker's in-process caches/indexes (all of them, or just `names`)
+    so they are rebuilt from the database on next use - call after a re-import.
+    """
+    return {"invalidated": cache.invalidate(names)}
+
+
+@router.get("/status/diagnostics", dependencies=[Depends(require_api_key)])
+async def get_diagnostics(limit: Optional[int] = Query(default=None, ge=1)):
+    """
+    This worker's captured slow statements (SQL, parameters, EXPLAIN plan) and
+    requests over the statement limit, newest first. Off unless REPCHECK_SLOW_QUERY_MS
+    and/or REPCHECK_MAX_STATEMENTS_PER_REQUEST are set.
+    """
+    return diagnostics.snapshot(limit)
+
+
+@router.post("/status/diagnostics/clear", dependencies=[Depends(require_api_key)])
+async def clear_diagnostics():
+    diagnostics.clear()
+    return {"cleared": True}
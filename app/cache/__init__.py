@@ -0,0 +1,47 @@
+import logging
+
+log = logging.getLogger(__name__)
+
+# Every in-process cache/index registers itself here so that it can be
+# invalidated (e.g. after a re-import) or inspected from the status routes.
+# Each entry needs an `invalidate()` method and a `loaded` property, and can
+# have a `warm()` method that preloads it (if enabled) before a worker serves.
+_registry = {}
+
+
+def register(name, cache):
+    _registry[name] = cache
+    return cache
+
+
+def registered():
+    return dict(_registry)
+
+
+def invalidate(names=None):
+    """
+    Invalidate the named caches (or all of them) and return the names that were invalidated.
+    """
+    invalidated = []
+    for name, cache in _registry.items():
+        if names and name not in names:
+            continue
+        cache.invalidate()
+        invalidated.append(name)
+    log.info(f"Invalidated caches {invalidated}")
+    return invalidated
+
+
+def warm():
+    """
+    Preload every cache that can be warmed up front - blocking, so call it from a
+    thread. Returns the names of those that loaded something.
+    """
+    warmed = []
+    for name, cache in _registry.items():
+        if hasattr(cache, "warm") and cache.warm():
+            warmed.append(name)
+    return warmed
+
+
+from .zip_index import zip_index
@@ -0,0 +1,60 @@
+from typing import Hashable
+import gzip
+import logging
+import os
+
+import brotli
+
+from . import register
+from .lru import VersionedLRUCache
+
+log = logging.getLogger(__name__)
+
+# Total size of the cached bodies (all encodings) per worker - 0 turns the cache off
+GEOMETRY_CACHE_MAX_BYTES = int(os.getenv("REPCHECK_GEOMETRY_CACHE_BYTES", str(256 * 1024 * 1024)))
+
+# The first request for an area pays for compressing it, so keep these moderate
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# Below this it's not worth the Content-Encoding
+MIN_COMPRESS_BYTES = 1024
+
+
+class EncodedBody:
+    """
+    One serialized response body, plus its gzip/brotli encodings (None when
+    the body is too small to bother).
+    """
+    __slots__ = ("identity", "gzip", "br")
+
+    def __init__(self, identity: bytes):
+        self.identity = identity
+        if len(identity) >= MIN_COMPRESS_BYTES:
+            self.gzip = gzip.compress(identity, GZIP_LEVEL, mtime=0)
+            self.br = brotli.compress(identity, quality=BROTLI_QUALITY)
+        else:
+            self.gzip = None
+            self.br = None
+
+    @property
+    def size(self) -> int:
+        return len(self.identity) + len(self.gzip or b"") + len(self.br or b"")
+
+
+class GeometryBlobCache(VersionedLRUCache):
+    """
+    Per-worker LRU of pre-serialized, pre-compressed geometry responses (per
+    area and simplification), bounded by their total size (all encodings).
+    """
+
+    def put(self, key: Hashable, version, body: bytes) -> EncodedBody:
+        """
+        Compress `body` and cache it - call it from a thread, big areas take a
+        moment to compress.
+        """
+        entry = EncodedBody(body)
+        self._store(key, version, entry, entry.size)
+        return entry
+
+
+geometry_cache = register("geometry_cache", GeometryBlobCache(GEOMETRY_CACHE_MAX_BYTES))
@@ -0,0 +1,102 @@
+from collections import OrderedDict
+from typing import Hashable, Optional
+import threading
+import time
+
+
+class _Entry:
+    __slots__ = ("value", "version", "size", "expires_at")
+
+    def __init__(self, value, version, size: int, expires_at: Optional[float]):
+        self.value = value
+        self.version = version
+        self.size = size
+        self.expires_at = expires_at
+
+
+class VersionedLRUCache:
+    """
+    Per-worker LRU of serialized responses, bounded by their total size in
+    bytes, with an optional TTL.
+
+    Every entry remembers the data version it was built from, and a lookup
+    with a different version is a miss - so a write to the tables involved
+    (from any worker or importer) invalidates it everywhere, not just in the
+    worker that was told to.
+    """
+
+    def __init__(self, max_bytes: int, ttl: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and (self.ttl is None or self.ttl > 0)
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+            }
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def get(self, key: Hashable, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (
+                entry.version != version or (entry.expires_at is not None and entry.expires_at <= time.monotonic())
+            ):
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def _store(self, key: Hashable, version, value, size: int):
+        if not self.enabled or size > self.max_bytes:
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = _Entry(value, version, size, expires_at)
+            self._bytes += size
+            # Least recently used first
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
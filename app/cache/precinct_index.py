@@ -0,0 +1,159 @@
+from sqlmodel import Session, select
+from typing import List, Optional
+import logging
+import math
+import os
+import threading
+import time
+
+import numpy as np
+from haversine import Unit, haversine_vector
+
+from . import register
+from ..database.database import get_engine
+from ..database.models import PrecinctElectionResultArea
+
+log = logging.getLogger(__name__)
+
+# Opt-in - set REPCHECK_PRECINCT_INDEX=1 to answer precinct radius queries from memory
+PRECINCT_INDEX_ENABLED = os.getenv("REPCHECK_PRECINCT_INDEX", "0") == "1"
+
+GRID_CELL_DEGREES = 0.25
+
+
+def bounding_box(lat: float, lon: float, radius_miles: float):
+    """
+    Approximate (lat_min, lat_max, lon_min, lon_max) box around a point - the
+    same approximation the precinct endpoint has always pre-filtered with.
+    """
+    deg_lat = radius_miles / 69.0
+    # cos(latitude) in radians
+    deg_lon = radius_miles / (69.0 * math.cos(math.radians(lat)))
+    return lat - deg_lat, lat + deg_lat, lon - deg_lon, lon + deg_lon
+
+
+class _Snapshot:
+    """
+    Immutable arrays for one load, so a reload never changes them under a reader.
+    """
+
+    def __init__(self, ids, lat, lon, cells):
+        self.ids = ids
+        self.lat = lat
+        self.lon = lon
+        self.cells = cells
+
+
+class PrecinctIndex:
+    """
+    Per-worker grid index over precinct centroids. Radius queries pick the grid
+    cells overlapping the bounding box, then run a vectorized haversine over
+    just those precincts.
+    """
+
+    def __init__(self, cell_degrees: float = GRID_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_Snapshot] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def load(self, session: Session):
+        start = time.perf_counter()
+        rows = session.exec(
+            select(
+                PrecinctElectionResultArea.precinct_id,
+                PrecinctElectionResultArea.centroid_lat,
+                PrecinctElectionResultArea.centroid_lon,
+            )
+            .where(PrecinctElectionResultArea.centroid_lat.is_not(None))
+            .where(PrecinctElectionResultArea.centroid_lon.is_not(None))
+        ).all()
+
+        ids = np.array([r[0] for r in rows], dtype=object)
+        lat = np.array([r[1] for r in rows], dtype=np.float64)
+        lon = np.array([r[2] for r in rows], dtype=np.float64)
+
+        # Group the precinct positions by grid cell
+        cell_lat = np.floor(lat / self.cell_degrees).astype(np.int64)
+        cell_lon = np.floor(lon / self.cell_degrees).astype(np.int64)
+        order = np.lexsort((cell_lon, cell_lat))
+        cells = {}
+        if len(order):
+            keys = np.stack((cell_lat[order], cell_lon[order]), axis=1)
+            boundaries = np.flatnonzero(np.any(np.diff(keys, axis=0) != 0, axis=1)) + 1
+            for group in np.split(order, boundaries):
+                cells[(int(cell_lat[group[0]]), int(cell_lon[group[0]]))] = group
+
+        self._snapshot = _Snapshot(ids, lat, lon, cells)
+        log.info(
+            f"Loaded precinct index with {len(ids)} precincts in {len(cells)} cells "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+
+    def warm(self) -> bool:
+        if not PRECINCT_INDEX_ENABLED:
+            return False
+        self.ensure_loaded()
+        return True
+
+    def ensure_loaded(self) -> _Snapshot:
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None:
+                with Session(get_engine()) as session:
+                    self.load(session)
+            return self._snapshot
+
+    def _within(self, snapshot: _Snapshot, lat: float, lon: float, radius_miles: float) -> List[str]:
+        lat_min, lat_max, lon_min, lon_max = bounding_box(lat, lon, radius_miles)
+
+        candidates = [
+            snapshot.cells[(i, j)]
+            for i in range(math.floor(lat_min / self.cell_degrees), math.floor(lat_max / self.cell_degrees) + 1)
+            for j in range(math.floor(lon_min / self.cell_degrees), math.floor(lon_max / self.cell_degrees) + 1)
+            if (i, j) in snapshot.cells
+        ]
+        if not candidates:
+            return []
+        idx = np.concatenate(candidates)
+
+        c_lat = snapshot.lat[idx]
+        c_lon = snapshot.lon[idx]
+        in_box = (c_lat >= lat_min) & (c_lat <= lat_max) & (c_lon >= lon_min) & (c_lon <= lon_max)
+        idx = idx[in_box]
+
+        # The haversine package's own vectorized version, so boundary precincts come
+        # out the same as with haversine.haversine(..., unit=Unit.MILES)
+        dist = haversine_vector(
+            (lat, lon), np.column_stack((c_lat[in_box], c_lon[in_box])), Unit.MILES, comb=True
+        ).ravel()
+
+        return snapshot.ids[idx[dist <= radius_miles]].tolist()
+
+    def lookup(self, lat: float, lon: float, radius_miles: float) -> Optional[List[str]]:
+        """
+        Non-blocking - ids of precincts whose centroid is within the radius, or
+        None if this worker still has to load the index.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        return self._within(snapshot, lat, lon, radius_miles)
+
+    def get(self, lat: float, lon: float, radius_miles: float) -> List[str]:
+        """
+        Blocking - loads the index first if needed, so call it from a thread.
+        """
+        return self._within(self.ensure_loaded(), lat, lon, radius_miles)
+
+
+precinct_index = register("precinct_index", PrecinctIndex())
@@ -0,0 +1,28 @@
+from typing import Hashable
+import logging
+import os
+
+from . import register
+from .lru import VersionedLRUCache
+
+log = logging.getLogger(__name__)
+
+# Serialized /api/zipcodes/{zip_code}/bills responses kept per worker - 0 bytes turns it off
+BILLS_CACHE_MAX_BYTES = int(os.getenv("REPCHECK_BILLS_CACHE_BYTES", str(64 * 1024 * 1024)))
+BILLS_CACHE_TTL = float(os.getenv("REPCHECK_BILLS_CACHE_TTL", "300"))
+
+
+class ResultCache(VersionedLRUCache):
+    """
+    Per-worker LRU of serialized query results with a TTL, bounded by their
+    total size in bytes - entries are versioned like the geometry cache's.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        super().__init__(max_bytes, ttl)
+
+    def put(self, key: Hashable, version, body: bytes):
+        self._store(key, version, body, len(body))
+
+
+bills_cache = register("bills_cache", ResultCache(BILLS_CACHE_MAX_BYTES, BILLS_CACHE_TTL))
@@ -0,0 +1,60 @@
+from pathlib import Path
+from typing import Optional
+import logging
+import os
+import shutil
+import tempfile
+
+from . import register
+
+log = logging.getLogger(__name__)
+
+TILE_CACHE_DIR = os.getenv("REPCHECK_TILE_CACHE_DIR", "tile_cache")
+
+
+class TileCache:
+    """
+    On-disk cache of rendered vector tiles, laid out as {layer}/{z}/{x}/{y}.mvt.
+    Shared by every worker on the machine - writes go through a temp file and
+    an atomic rename so readers never see a partial tile.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    @property
+    def loaded(self) -> bool:
+        return self.directory.is_dir()
+
+    def _path(self, layer: str, z: int, x: int, y: int) -> Path:
+        return self.directory / layer / str(z) / str(x) / f"{y}.mvt"
+
+    def get(self, layer: str, z: int, x: int, y: int) -> Optional[bytes]:
+        try:
+            return self._path(layer, z, x, y).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put(self, layer: str, z: int, x: int, y: int, tile: bytes):
+        path = self._path(layer, z, x, y)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(tile)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def invalidate(self):
+        # Move it aside first so no worker writes into a half-deleted tree
+        if not self.directory.is_dir():
+            return
+        trash = self.directory.with_name(f"{self.directory.name}.{os.getpid()}.old")
+        os.replace(self.directory, trash)
+        shutil.rmtree(trash, ignore_errors=True)
+        log.info(f"Cleared tile cache {self.directory}")
+
+
+tile_cache = register("tile_cache", TileCache(TILE_CACHE_DIR))
@@ -0,0 +1,143 @@
+from sqlmodel import Session, select
+from typing import Dict, List, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+from . import register
+from ..database.database import get_engine
+from ..database.models import AREA_COLUMNS, Area, PersonArea, PersonTable, PersonWithAreas
+
+log = logging.getLogger(__name__)
+
+ZIP_AREA_PREFIX = "ocd-division/country:us/zipcode:"
+
+# Opt-in - set REPCHECK_ZIP_INDEX=1 to answer /api/people/{zip_code} from memory
+ZIP_INDEX_ENABLED = os.getenv("REPCHECK_ZIP_INDEX", "0") == "1"
+# Optional max age (seconds) after which a worker reloads on its own, 0 = never
+ZIP_INDEX_MAX_AGE = float(os.getenv("REPCHECK_ZIP_INDEX_MAX_AGE", "0"))
+
+
+def people_by_zip(session: Session, zip_codes: Optional[List[str]] = None) -> Dict[str, List[PersonWithAreas]]:
+    """
+    Representatives of each zip code (every zip code by default), from
+    person_area, people and areas in three queries total. People are shared
+    between zip codes, so treat them as read-only.
+    """
+    zip_people_query = select(PersonArea.area_id, PersonArea.person_id).distinct()
+    if zip_codes is None:
+        zip_people = session.exec(zip_people_query.where(PersonArea.area_id.startswith(ZIP_AREA_PREFIX))).all()
+        people = session.exec(select(PersonTable)).all()
+    else:
+        zip_people = session.exec(
+            zip_people_query.where(PersonArea.area_id.in_([ZIP_AREA_PREFIX + z for z in zip_codes]))
+        ).all()
+        people = session.exec(
+            select(PersonTable).where(PersonTable.id.in_({person_id for _, person_id in zip_people}))
+        ).all()
+
+    area_ids = set([])
+    for p in people:
+        area_ids.add(p.constituent_area_id)
+        area_ids.add(p.jurisdiction_area_id)
+
+    areas = {
+        row.id: dict(row._mapping)
+        for row in session.exec(
+            select(*AREA_COLUMNS).where(Area.id.in_(area_ids))
+        ).all()
+    }
+
+    people_with_areas = {}
+    for p in people:
+        p_with_area = PersonWithAreas(**p.dict())
+        p_with_area.constituent_area = areas.get(p.constituent_area_id)
+        p_with_area.jurisdiction_area = areas.get(p.jurisdiction_area_id)
+        people_with_areas[p.id] = p_with_area
+
+    by_zip: Dict[str, List[PersonWithAreas]] = {z: [] for z in zip_codes or ()}
+    for area_id, person_id in zip_people:
+        person = people_with_areas.get(person_id)
+        if person is None:
+            continue
+        by_zip.setdefault(area_id[len(ZIP_AREA_PREFIX):], []).append(person)
+    return by_zip
+
+
+class ZipIndex:
+    """
+    Per-worker map of zip code -> finished List[PersonWithAreas] payload, built
+    by people_by_zip() for every zip code at once.
+
+    The PersonWithAreas objects are shared between zip codes (and requests), so
+    they must be treated as read-only.
+    """
+
+    def __init__(self, max_age: float = 0):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._by_zip: Optional[Dict[str, Tuple[PersonWithAreas, ...]]] = None
+        self._loaded_at: Optional[float] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._by_zip is not None
+
+    def _expired(self) -> bool:
+        loaded_at = self._loaded_at
+        return bool(self.max_age) and (loaded_at is None or time.monotonic() - loaded_at > self.max_age)
+
+    def invalidate(self):
+        with self._lock:
+            self._by_zip = None
+            self._loaded_at = None
+
+    def load(self, session: Session):
+        start = time.perf_counter()
+
+        by_zip = people_by_zip(session)
+        self._by_zip = {zip_code: tuple(p) for zip_code, p in by_zip.items()}
+        self._loaded_at = time.monotonic()
+        people_count = len({p.id for people in by_zip.values() for p in people})
+        log.info(
+            f"Loaded zip index with {len(self._by_zip)} zip codes and {people_count} people "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+
+    def warm(self) -> bool:
+        if not ZIP_INDEX_ENABLED:
+            return False
+        self.ensure_loaded()
+        return True
+
+    def ensure_loaded(self) -> Dict[str, Tuple[PersonWithAreas, ...]]:
+        by_zip = self._by_zip
+        if by_zip is not None and not self._expired():
+            return by_zip
+        with self._lock:
+            # Another thread may have loaded it while we waited on the lock
+            if self._by_zip is None or self._expired():
+                with Session(get_engine()) as session:
+                    self.load(session)
+            return self._by_zip
+
+    def lookup(self, zip_code: str) -> Optional[List[PersonWithAreas]]:
+        """
+        Non-blocking - the representatives for a zip code, or None if this
+        worker still has to (re)load the index.
+        """
+        by_zip = self._by_zip
+        if by_zip is None or self._expired():
+            return None
+        return list(by_zip.get(zip_code, ()))
+
+    def get(self, zip_code: str) -> List[PersonWithAreas]:
+        """
+        Blocking - loads the index first if needed, so call it from a thread.
+        """
+        by_zip = self.ensure_loaded()
+        return list(by_zip.get(zip_code, ()))
+
+
+zip_index = register("zip_index", ZipIndex(max_age=ZIP_INDEX_MAX_AGE))
@@ -1,10 +1,20 @@
+from contextlib import asynccontextmanager
 from sqlmodel import create_engine, Session, SQLModel, inspect
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+from fastapi import Request
+from starlette.concurrency import run_in_threadpool
 import logging
 from pathlib import Path
 from dotenv import load_dotenv
 from urllib.parse import quote
 import os
+import threading
+import time
+
+from . import models  # registers the tables on SQLModel.metadata before create_all
+from .derived import ensure_derived_schema
 
 log = logging.getLogger(__name__)
 
@@ -14,36 +24,227 @@ env_path = parent_dir / '.env'
 log.info(f"Loading .env from {env_path}")
 load_dotenv(dotenv_path=env_path)
 
+# After load_dotenv - diagnostics reads its settings from the environment on import
+from .. import admission, diagnostics, metrics  # noqa: E402
+
 POSTGRES_DB_PASSWORD = os.getenv("POSTGRES_DB_PASSWORD")
+# Opt-in - set REPCHECK_ASYNC_DB=1 to serve the routers from an asyncpg engine
+ASYNC_DB_ENABLED = os.getenv("REPCHECK_ASYNC_DB", "0") == "1"
 
-# Define connection parameters
+# Define connection parameters - overridable so e.g. benchmarks can run against their own database
 connection_params = {
-    'username': 'postgres',
-    'password': quote(POSTGRES_DB_PASSWORD),
-    'host': 'localhost',  # or '127.0.0.1'
-    'port': '5432',  # Default PostgreSQL port
-    'database': 'repcheck'
+    'username': os.getenv("POSTGRES_USER", 'postgres'),
+    # Engines are created on first use - importing this (e.g. benchmarks) works without one
+    'password': quote(POSTGRES_DB_PASSWORD or ""),
+    'host': os.getenv("POSTGRES_HOST", 'localhost'),  # or '127.0.0.1'
+    'port': os.getenv("POSTGRES_PORT", '5432'),  # Default PostgreSQL port
+    'database': os.getenv("POSTGRES_DB", 'repcheck')
+}
+
+pool_options = {
+    'pool_size': 5,        # Default is 5
+    'max_overflow': 10,    # Default is 10 (additional connections beyond pool_size)
+    'pool_recycle': 1800,  # Recycle connections after 30 minutes
+    'pool_pre_ping': True  # Check if connections are still valid
 }
 
-# Create an engine using SQLModel
+# Connection URLs - nothing connects until the engines are first used
 database_url = (
     f"postgresql+psycopg2://{connection_params['username']}:{connection_params['password']}"
     f"@{connection_params['host']}:{connection_params['port']}/{connection_params['database']}"
 )
-engine = create_engine(
-    database_url,
-    pool_size=5,       # Default is 5
-    max_overflow=10,   # Default is 10 (additional connections beyond pool_size)
-    pool_recycle=1800, # Recycle connections after 30 minutes
-    pool_pre_ping=True # Check if connections are still valid
-)
-# Ensure all tables exist!
-SQLModel.metadata.create_all(engine)
+# The async engine shares the settings but is only created when enabled
+async_database_url = database_url.replace("postgresql+psycopg2://", "postgresql+asyncpg://", 1)
+
+# Caps the requests holding a session at what the pool can serve, see app/admission.py
+db_admission = admission.create_controller(pool_options['pool_size'] + pool_options['max_overflow'])
+
+# Created on first use rather than on import, so importing the app (or a
+# worker booting) doesn't need the database - see get_engine()
+_engine = None
+_async_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = create_engine(database_url, poolclass=metrics.TimedQueuePool, **pool_options)
+                # Statement count, DB time, rows and pool waits per request, see app/metrics.py
+                metrics.instrument_engine(engine, "sync")
+                # Opt-in slow statement plans / statements-per-request limit, see app/diagnostics.py
+                diagnostics.instrument_engine(engine)
+                _engine = engine
+    return _engine
+
+
+def get_async_engine():
+    """
+    The asyncpg engine, or None unless REPCHECK_ASYNC_DB=1.
+    """
+    global _async_engine
+    if ASYNC_DB_ENABLED and _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                engine = create_async_engine(
+                    async_database_url, poolclass=metrics.TimedAsyncAdaptedQueuePool, **pool_options
+                )
+                metrics.instrument_engine(engine.sync_engine, "async")
+                diagnostics.instrument_engine(engine.sync_engine)
+                _async_engine = engine
+    return _async_engine
+
+
+def create_schema(engine=None):
+    """
+    Create missing tables, and the triggers/columns that keep derived data in
+    sync. An explicit step (python -m app.database.derived schema, or
+    REPCHECK_CREATE_SCHEMA=1 at startup) rather than something every worker
+    does on import.
+    """
+    engine = engine or get_engine()
+    start = time.perf_counter()
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as connection:
+        ensure_derived_schema(connection)
+    log.info(f"Schema is up to date ({time.perf_counter() - start:.1f}s)")
+
+
+def warm_pool(engine=None, connections: int = pool_options['pool_size']):
+    """
+    Open up to `connections` pooled connections now instead of on the first requests.
+    """
+    engine = engine or get_engine()
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(engine.connect())
+    finally:
+        for connection in opened:
+            connection.close()
+    return len(opened)
+
+
+async def warm_async_pool(connections: int = pool_options['pool_size']):
+    """
+    warm_pool() for the asyncpg engine, if enabled.
+    """
+    engine = get_async_engine()
+    if engine is None:
+        return 0
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(await engine.connect())
+    finally:
+        for connection in opened:
+            await connection.close()
+    return len(opened)
+
+
+def pool_status(engine=None) -> dict:
+    pool = (engine or get_engine()).pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        "max_overflow": pool_options['max_overflow'],
+    }
+
+
+def check_database(engine=None) -> float:
+    """
+    Round trip a SELECT 1 through the pool - the latency in seconds, or raises.
+    """
+    start = time.perf_counter()
+    with (engine or get_engine()).connect() as connection:
+        connection.exec_driver_sql("SELECT 1")
+    return time.perf_counter() - start
 
 
 def get_session():
-    session = Session(engine)
+    session = Session(get_engine())
     try:
         yield session
     finally:
         session.close()
+
+
+class ThreadedSession:
+    """
+    Awaitable facade over a sync (psycopg2) Session - every call runs on the
+    threadpool. It mirrors the parts of AsyncSession the routers use, so they
+    can be written once and run on either engine.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    async def exec(self, statement, **kwargs):
+        return await run_in_threadpool(self.sync_session.exec, statement, **kwargs)
+
+    async def execute(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self.sync_session.execute, statement, params, **kwargs)
+
+    async def scalar(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, params, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+
+@asynccontextmanager
+async def admitted_session(request: Request):
+    """
+    AsyncSession on the asyncpg engine when REPCHECK_ASYNC_DB=1, otherwise the
+    sync engine behind a ThreadedSession - once admitted (see app/admission.py),
+    and with the route's statement_timeout on every transaction it begins.
+    """
+    await db_admission.acquire()
+    try:
+        route = request.scope.get("route")
+        timeout_ms = admission.statement_timeout_ms(getattr(route, "path", None))
+        async_engine = get_async_engine()
+        if async_engine is not None:
+            async with AsyncSession(async_engine, expire_on_commit=False) as session:
+                session.sync_session.info[admission.STATEMENT_TIMEOUT_INFO_KEY] = timeout_ms
+                yield session
+        else:
+            session = ThreadedSession(Session(get_engine()))
+            session.sync_session.info[admission.STATEMENT_TIMEOUT_INFO_KEY] = timeout_ms
+            try:
+                yield session
+            finally:
+                await session.close()
+    except Exception as e:
+        # The routes turn DB errors into 500s - a statement_timeout is load, not a bug
+        if admission.is_statement_timeout(e):
+            raise admission.statement_timeout_error() from e
+        raise
+    finally:
+        db_admission.release()
+
+
+async def get_async_session(request: Request):
+    """
+    admitted_session() as a dependency. Routes that coalesce requests (see
+    app/api/single_flight.py) open one themselves instead, only when they do
+    the work - a request waiting on another's result holds no slot.
+    """
+    async with admitted_session(request) as session:
+        yield session
@@ -0,0 +1,318 @@
+"""
+Derived (denormalized) tables and columns that are maintained inside Postgres
+with triggers, so they stay in sync no matter who writes the source tables.
+
+ensure_derived_schema() is idempotent and runs after create_all(), both part
+of the explicit schema step. Backfills of existing rows are explicit too since
+they can take a while on a full database:
+
+    python -m app.database.derived schema
+    python -m app.database.derived backfill
+"""
+from sqlalchemy import text
+import argparse
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+# Arbitrary key so concurrently starting workers don't race on the DDL below
+DERIVED_SCHEMA_LOCK_ID = 724_311_001
+
+
+VOTE_RECORDS_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION vote_records_sync() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' THEN
+            DELETE FROM vote_records WHERE vote_event_id = OLD.id;
+        END IF;
+
+        INSERT INTO vote_records (vote_event_id, bill_id, voter_id, voter_name, option)
+        SELECT NEW.id, NEW.bill_id, v->>'voter_id', v->>'voter_name', v->>'option'
+        FROM jsonb_array_elements(
+            CASE WHEN jsonb_typeof(NEW.votes) = 'array' THEN NEW.votes ELSE '[]'::jsonb END
+        ) AS v
+        WHERE v->>'voter_id' IS NOT NULL
+        ON CONFLICT DO NOTHING;
+
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS vote_records_sync ON vote_events",
+    """
+    CREATE TRIGGER vote_records_sync
+    AFTER INSERT OR UPDATE OF votes, bill_id ON vote_events
+    FOR EACH ROW EXECUTE FUNCTION vote_records_sync()
+    """,
+    # Deletes are handled by the ON DELETE CASCADE foreign key
+]
+
+LATEST_VOTE_DATE_DDL = [
+    # create_all() doesn't add columns/indexes to existing tables
+    "ALTER TABLE bills ADD COLUMN IF NOT EXISTS latest_vote_date TIMESTAMP WITHOUT TIME ZONE",
+    """
+    CREATE INDEX IF NOT EXISTS ix_bills_jurisdiction_area_id_latest_vote_date
+    ON bills (jurisdiction_area_id, latest_vote_date, id)
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_vote_events_bill_id ON vote_events (bill_id)",
+    """
+    CREATE OR REPLACE FUNCTION bills_latest_vote_date_sync() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE bills SET latest_vote_date = NEW.start_date
+            WHERE id = NEW.bill_id
+            AND (latest_vote_date IS NULL OR latest_vote_date < NEW.start_date);
+        ELSE
+            -- The vote may have moved to another bill or been removed, so recompute
+            UPDATE bills b SET latest_vote_date = (
+                SELECT max(ve.start_date) FROM vote_events ve WHERE ve.bill_id = b.id
+            )
+            WHERE b.id = OLD.bill_id;
+
+            IF TG_OP = 'UPDATE' AND NEW.bill_id IS DISTINCT FROM OLD.bill_id THEN
+                UPDATE bills b SET latest_vote_date = (
+                    SELECT max(ve.start_date) FROM vote_events ve WHERE ve.bill_id = b.id
+                )
+                WHERE b.id = NEW.bill_id;
+            END IF;
+        END IF;
+
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS bills_latest_vote_date_sync ON vote_events",
+    """
+    CREATE TRIGGER bills_latest_vote_date_sync
+    AFTER INSERT OR UPDATE OF start_date, bill_id OR DELETE ON vote_events
+    FOR EACH ROW EXECUTE FUNCTION bills_latest_vote_date_sync()
+    """,
+]
+
+BILLS_INDEXES_DDL = [
+    # The default bills order, per jurisdiction (bills pages, newest bill ids per ZIP)
+    """
+    CREATE INDEX IF NOT EXISTS ix_bills_jurisdiction_area_id_latest_action_date
+    ON bills (jurisdiction_area_id, latest_action_date, id)
+    """,
+]
+
+# Degrees - roughly 1km, 100m and 10m. The API picks one from the requested zoom.
+AREA_SIMPLIFY_TOLERANCES = (0.01, 0.001, 0.0001)
+_tolerances_sql = ", ".join(str(t) for t in AREA_SIMPLIFY_TOLERANCES)
+
+AREA_SIMPLIFIED_GEOMETRIES_DDL = [
+    f"""
+    CREATE OR REPLACE FUNCTION area_simplified_geometries_sync() RETURNS trigger AS $$
+    BEGIN
+        DELETE FROM area_simplified_geometries WHERE area_id = NEW.id;
+
+        INSERT INTO area_simplified_geometries (area_id, tolerance, geometry)
+        SELECT NEW.id, t, ST_SimplifyPreserveTopology(NEW.geometry, t)
+        FROM unnest(ARRAY[{_tolerances_sql}]::double precision[]) AS t;
+
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS area_simplified_geometries_sync ON areas",
+    """
+    CREATE TRIGGER area_simplified_geometries_sync
+    AFTER INSERT OR UPDATE OF geometry ON areas
+    FOR EACH ROW EXECUTE FUNCTION area_simplified_geometries_sync()
+    """,
+]
+
+# Text search configuration for bills.search_vector (and the queries against it)
+SEARCH_CONFIG = "english"
+
+# Title first, then other titles and subjects, then abstracts, then the AI summary
+_search_vector_sql = f"""
+    setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({{row}}.title, '')), 'A')
+    || setweight(jsonb_to_tsvector('{SEARCH_CONFIG}', coalesce({{row}}.other_titles, '[]'), '["string"]'), 'B')
+    || setweight(jsonb_to_tsvector('{SEARCH_CONFIG}', coalesce({{row}}.subject, '[]'), '["string"]'), 'B')
+    || setweight(jsonb_to_tsvector('{SEARCH_CONFIG}', coalesce({{row}}.abstracts, '[]'), '["string"]'), 'C')
+    || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({{row}}.ai_summary, '')), 'D')
+"""
+
+SEARCH_VECTOR_DDL = [
+    "ALTER TABLE bills ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "CREATE INDEX IF NOT EXISTS ix_bills_search_vector ON bills USING gin (search_vector)",
+    f"""
+    CREATE OR REPLACE FUNCTION bills_search_vector_sync() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {_search_vector_sql.format(row="NEW")};
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS bills_search_vector_sync ON bills",
+    """
+    CREATE TRIGGER bills_search_vector_sync
+    BEFORE INSERT OR UPDATE OF title, other_titles, subject, abstracts, ai_summary ON bills
+    FOR EACH ROW EXECUTE FUNCTION bills_search_vector_sync()
+    """,
+]
+
+# Tables whose writes bump their row in data_versions (and so every ETag built on it)
+DATA_VERSION_TABLES = ("areas", "precinct_election_result_area", "people", "person_area", "bills", "vote_events")
+_data_version_tables_sql = ", ".join(f"'{t}'" for t in DATA_VERSION_TABLES)
+
+DATA_VERSIONS_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION data_versions_bump() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO data_versions (name, version, modified_at)
+        VALUES (TG_TABLE_NAME, 1, clock_timestamp() AT TIME ZONE 'utc')
+        ON CONFLICT (name) DO UPDATE
+        SET version = data_versions.version + 1, modified_at = EXCLUDED.modified_at;
+
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    # Start from 0 so existing tables get a version (and a Last-Modified) right away
+    f"""
+    INSERT INTO data_versions (name, version, modified_at)
+    SELECT t, 0, now() AT TIME ZONE 'utc'
+    FROM unnest(ARRAY[{_data_version_tables_sql}]) AS t
+    ON CONFLICT DO NOTHING
+    """,
+] + [
+    statement
+    for table in DATA_VERSION_TABLES
+    for statement in (
+        f"DROP TRIGGER IF EXISTS data_versions_bump ON {table}",
+        f"""
+        CREATE TRIGGER data_versions_bump
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+        FOR EACH STATEMENT EXECUTE FUNCTION data_versions_bump()
+        """,
+    )
+]
+
+
+def ensure_derived_schema(connection):
+    """
+    Create/replace the trigger functions, triggers, columns and indexes that
+    maintain the derived data. Safe to run on every start.
+    """
+    connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": DERIVED_SCHEMA_LOCK_ID})
+    for statement in (
+        VOTE_RECORDS_DDL + LATEST_VOTE_DATE_DDL + BILLS_INDEXES_DDL + AREA_SIMPLIFIED_GEOMETRIES_DDL
+        + SEARCH_VECTOR_DDL + DATA_VERSIONS_DDL
+    ):
+        connection.execute(text(statement))
+
+
+def backfill_vote_records(connection):
+    """
+    Rebuild vote_records from vote_events.votes.
+    """
+    connection.execute(text("DELETE FROM vote_records"))
+    result = connection.execute(text(
+        """
+        INSERT INTO vote_records (vote_event_id, bill_id, voter_id, voter_name, option)
+        SELECT ve.id, ve.bill_id, v->>'voter_id', v->>'voter_name', v->>'option'
+        FROM vote_events ve,
+        jsonb_array_elements(
+            CASE WHEN jsonb_typeof(ve.votes) = 'array' THEN ve.votes ELSE '[]'::jsonb END
+        ) AS v
+        WHERE v->>'voter_id' IS NOT NULL
+        ON CONFLICT DO NOTHING
+        """
+    ))
+    return result.rowcount
+
+
+def backfill_latest_vote_date(connection):
+    """
+    Recompute bills.latest_vote_date from vote_events.
+    """
+    result = connection.execute(text(
+        """
+        UPDATE bills b SET latest_vote_date = v.max_start_date
+        FROM (
+            SELECT bill_id, max(start_date) AS max_start_date
+            FROM vote_events
+            GROUP BY bill_id
+        ) v
+        WHERE b.id = v.bill_id
+        AND b.latest_vote_date IS DISTINCT FROM v.max_start_date
+        """
+    ))
+    cleared = connection.execute(text(
+        """
+        UPDATE bills b SET latest_vote_date = NULL
+        WHERE b.latest_vote_date IS NOT NULL
+        AND NOT EXISTS (SELECT 1 FROM vote_events ve WHERE ve.bill_id = b.id)
+        """
+    ))
+    return result.rowcount + cleared.rowcount
+
+
+def backfill_area_simplified_geometries(connection):
+    """
+    Recompute every simplified area geometry.
+    """
+    connection.execute(text("DELETE FROM area_simplified_geometries"))
+    result = connection.execute(text(
+        f"""
+        INSERT INTO area_simplified_geometries (area_id, tolerance, geometry)
+        SELECT a.id, t, ST_SimplifyPreserveTopology(a.geometry, t)
+        FROM areas a
+        CROSS JOIN unnest(ARRAY[{_tolerances_sql}]::double precision[]) AS t
+        """
+    ))
+    return result.rowcount
+
+
+def backfill_search_vector(connection):
+    """
+    Recompute bills.search_vector.
+    """
+    result = connection.execute(text(
+        f"UPDATE bills SET search_vector = {_search_vector_sql.format(row='bills')}"
+    ))
+    return result.rowcount
+
+
+BACKFILLS = {
+    "vote_records": backfill_vote_records,
+    "latest_vote_date": backfill_latest_vote_date,
+    "area_simplified_geometries": backfill_area_simplified_geometries,
+    "search_vector": backfill_search_vector,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the schema and derived tables and columns.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("schema", help="Create missing tables and the derived data triggers/columns/indexes")
+    backfill_parser = subparsers.add_parser("backfill", help="Recompute derived data for existing rows")
+    backfill_parser.add_argument("names", nargs="*", help=f"Any of {list(BACKFILLS)} (default: all)")
+    args = parser.parse_args()
+
+    unknown = set(getattr(args, "names", [])) - set(BACKFILLS)
+    if unknown:
+        parser.error(f"Unknown backfill(s) {sorted(unknown)}")
+
+    from .database import create_schema, get_engine
+
+    engine = get_engine()
+    create_schema(engine)
+    if args.command == "schema":
+        return
+
+    for name in args.names or list(BACKFILLS):
+        start = time.perf_counter()
+        with engine.begin() as connection:
+            rows = BACKFILLS[name](connection)
+        log.info(f"Backfilled {name}: {rows} rows in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    main()
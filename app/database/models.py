@@ -1,8 +1,8 @@
 from sqlmodel import SQLModel, Field, Relationship
 from geoalchemy2 import Geometry
 from datetime import datetime, timezone
-from sqlalchemy import Column, ARRAY, Text, BigInteger, DOUBLE_PRECISION, DateTime, text
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import Column, ARRAY, Text, BigInteger, DOUBLE_PRECISION, DateTime, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from typing import List, Optional, Dict
 
 
@@ -56,6 +56,29 @@ class Area(SQLModel, table=True):
         arbitrary_types_allowed = True
 
 
+# Everything but the geometry - same as area.dict(exclude={"geometry"}), without loading it
+AREA_COLUMNS = [c for c in Area.__table__.columns if c.name != "geometry"]
+
+
+class AreaSimplifiedGeometry(SQLModel, table=True):
+    """
+    Area geometry simplified at a few fixed tolerances (degrees) - computed by a
+    trigger on areas when they are imported (see derived.py).
+    """
+    __tablename__ = 'area_simplified_geometries'
+
+    area_id: str = Field(
+        sa_column=Column(Text, ForeignKey("areas.id", ondelete="CASCADE"), primary_key=True)
+    )
+    tolerance: float = Field(sa_column=Column(DOUBLE_PRECISION(), primary_key=True))
+    geometry: Geometry = Field(
+        sa_column=Column(Geometry("GEOMETRY", srid=4326, spatial_index=False), nullable=False)
+    )
+
+    class Config:
+        arbitrary_types_allowed = True
+
+
 class Person(SQLModel):
     id: str = Field(primary_key=True, nullable=False)
     jurisdiction_area_id: str = Field(foreign_key="areas.id", nullable=False)
@@ -105,6 +128,8 @@ class Bill(SQLModel):
     # Derived fields
     latest_action_date: Optional[datetime] = Field(default=None, sa_column=Column(DateTime))
     first_action_date: Optional[datetime] = Field(default=None, sa_column=Column(DateTime))
+    # max(vote_events.start_date), maintained by a trigger on vote_events (see derived.py)
+    latest_vote_date: Optional[datetime] = Field(default=None, sa_column=Column(DateTime))
     updated_at: datetime = Field(default=None, sa_column=Column(DateTime))
     created_at: datetime = Field(sa_column_kwargs={"server_default": text("CURRENT_TIMESTAMP")})
     jurisdiction_level: str
@@ -115,6 +140,9 @@ class Bill(SQLModel):
 class BillTable(Bill, table=True):
     __tablename__ = 'bills'
 
+    # Full-text search document, maintained by a trigger (see derived.py) - not part of the API models
+    search_vector: Optional[str] = Field(default=None, sa_column=Column(TSVECTOR))
+
 class VoteEvent(SQLModel, table=True):
     __tablename__ = 'vote_events'
 
@@ -133,5 +161,49 @@ class VoteEvent(SQLModel, table=True):
     extras: Dict = Field(default=None, sa_column=Column(JSONB))
 
 
+class VoteRecord(SQLModel, table=True):
+    """
+    One row per (vote event, voter) - derived from vote_events.votes and kept in
+    sync by the trigger in derived.py, so don't write to it directly.
+    """
+    __tablename__ = 'vote_records'
+    __table_args__ = (
+        Index("ix_vote_records_voter_id_bill_id", "voter_id", "bill_id"),
+    )
+
+    vote_event_id: str = Field(
+        sa_column=Column(Text, ForeignKey("vote_events.id", ondelete="CASCADE"), primary_key=True)
+    )
+    voter_id: str = Field(primary_key=True, nullable=False)
+    bill_id: str = Field(foreign_key="bills.id", nullable=False, index=True)
+    voter_name: Optional[str] = None
+    option: Optional[str] = None
+
+
+class DataVersion(SQLModel, table=True):
+    """
+    A counter per source table, bumped by a statement-level trigger on every
+    write to it (see derived.py) - the cheap "has anything changed" check
+    behind the API's ETags.
+    """
+    __tablename__ = 'data_versions'
+
+    name: str = Field(primary_key=True, nullable=False)
+    version: int = Field(default=0, sa_column=Column(BigInteger(), nullable=False))
+    modified_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime))
+
+
+class IngestWatermark(SQLModel, table=True):
+    """
+    How far an ingestion source has been loaded - the max updated_at of the
+    bills it delivered - so the next run only asks for newer ones.
+    """
+    __tablename__ = 'ingest_watermarks'
+
+    source: str = Field(primary_key=True, nullable=False)
+    updated_since: Optional[datetime] = Field(default=None, sa_column=Column(DateTime))
+    last_run_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime))
+
+
 class BillWithVotes(Bill):
     votes: List[VoteEvent] = Field(default=None, sa_column=Column(ARRAY(VoteEvent)))
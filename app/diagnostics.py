@@ -0,0 +1,216 @@
+"""
+Opt-in query diagnostics (off unless configured in `.env`):
+
+- Slow statements: any statement slower than REPCHECK_SLOW_QUERY_MS is, for a
+  REPCHECK_SLOW_QUERY_SAMPLE_RATE share of them, captured with its SQL, bound
+  parameters and - for SELECTs - an EXPLAIN (ANALYZE, BUFFERS) plan.
+- Chatty requests: any request that runs more than
+  REPCHECK_MAX_STATEMENTS_PER_REQUEST statements is flagged, with the
+  statements it repeated most (usually an N+1 loop).
+
+Both are kept in a per-worker ring buffer (GET /api/status/diagnostics) and,
+with REPCHECK_SLOW_QUERY_LOG set, appended as JSON lines to a rotating file.
+"""
+from collections import Counter, deque
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from typing import Dict, Optional
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from sqlalchemy import event
+
+from . import metrics
+
+log = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("REPCHECK_SLOW_QUERY_MS", "0"))
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv("REPCHECK_SLOW_QUERY_SAMPLE_RATE", "1.0"))
+# EXPLAIN ANALYZE runs the statement again, inside the same transaction - set 0 to only keep the SQL
+SLOW_QUERY_EXPLAIN = os.getenv("REPCHECK_SLOW_QUERY_EXPLAIN", "1") == "1"
+SLOW_QUERY_LOG = os.getenv("REPCHECK_SLOW_QUERY_LOG")
+MAX_STATEMENTS_PER_REQUEST = int(os.getenv("REPCHECK_MAX_STATEMENTS_PER_REQUEST", "0"))
+BUFFER_SIZE = int(os.getenv("REPCHECK_DIAGNOSTICS_BUFFER", "200"))
+
+MAX_PARAMS_CHARS = 2000
+# Repeated statements listed for a flagged request
+TOP_STATEMENTS = 5
+# Only these are safe to run again under EXPLAIN ANALYZE
+_DML_KEYWORDS = ("insert ", "update ", "delete ", "merge ")
+
+_lock = threading.Lock()
+slow_queries = deque(maxlen=BUFFER_SIZE)
+flagged_requests = deque(maxlen=BUFFER_SIZE)
+
+_file_log = None
+if SLOW_QUERY_LOG:
+    _file_log = logging.getLogger("repcheck.diagnostics")
+    _file_log.propagate = False
+    _file_log.setLevel(logging.INFO)
+    _handler = RotatingFileHandler(SLOW_QUERY_LOG, maxBytes=10 * 1024 * 1024, backupCount=5)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    _file_log.addHandler(_handler)
+
+
+def slow_queries_enabled() -> bool:
+    return SLOW_QUERY_MS > 0
+
+
+def statement_limit_enabled() -> bool:
+    return MAX_STATEMENTS_PER_REQUEST > 0
+
+
+def _record(buffer: deque, entry: Dict):
+    with _lock:
+        buffer.append(entry)
+    if _file_log is not None:
+        _file_log.info(json.dumps(entry, default=str))
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _explainable(statement: str) -> bool:
+    lowered = statement.lstrip().lower()
+    if lowered.startswith("select"):
+        return True
+    # A WITH is fine unless one of its parts writes
+    return lowered.startswith("with") and not any(keyword in lowered for keyword in _DML_KEYWORDS)
+
+
+def _explain(conn, statement: str, parameters) -> str:
+    """
+    EXPLAIN (ANALYZE, BUFFERS) on the raw DBAPI connection - so it doesn't go
+    through (or show up in) the engine events - inside a savepoint, so a
+    failure can't abort the caller's transaction.
+    """
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT repcheck_explain")
+        try:
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT repcheck_explain")
+            plan = f"EXPLAIN failed: {e}"
+        cursor.execute("RELEASE SAVEPOINT repcheck_explain")
+        return plan
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("repcheck_diagnostics_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["repcheck_diagnostics_start"].pop()) * 1000
+    stats = metrics.current_request()
+
+    if statement_limit_enabled() and stats is not None:
+        if stats.statement_counts is None:
+            stats.statement_counts = Counter()
+        stats.statement_counts[statement] += 1
+
+    if not slow_queries_enabled() or elapsed_ms < SLOW_QUERY_MS or random.random() >= SLOW_QUERY_SAMPLE_RATE:
+        return
+
+    plan = None
+    # Streamed (server-side cursor) results are still being read - leave those alone
+    if (
+        SLOW_QUERY_EXPLAIN
+        and not executemany
+        and _explainable(statement)
+        and not (context is not None and context.execution_options.get("stream_results"))
+    ):
+        try:
+            plan = _explain(conn, statement, parameters)
+        except Exception as e:
+            log.exception("Could not explain slow statement")
+            plan = f"EXPLAIN failed: {e}"
+
+    _record(slow_queries, {
+        "type": "slow_query",
+        "at": _now(),
+        "duration_ms": round(elapsed_ms, 3),
+        "method": stats.method if stats else None,
+        "path": stats.path if stats else None,
+        "sql": statement,
+        "parameters": repr(parameters)[:MAX_PARAMS_CHARS],
+        "plan": plan,
+    })
+    log.warning(f"Slow statement ({elapsed_ms:.0f} ms) on {stats.path if stats else 'no request'}: {statement[:200]}")
+
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get("repcheck_diagnostics_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def _check_request(stats: "metrics.RequestStats", status: int, duration: float):
+    if stats.statements <= MAX_STATEMENTS_PER_REQUEST:
+        return
+    repeated = [
+        {"sql": sql, "count": count}
+        for sql, count in (stats.statement_counts or Counter()).most_common(TOP_STATEMENTS)
+        if count > 1
+    ]
+    _record(flagged_requests, {
+        "type": "too_many_statements",
+        "at": _now(),
+        "method": stats.method,
+        "path": stats.path,
+        "route": stats.route,
+        "status": status,
+        "statements": stats.statements,
+        "db_ms": round(stats.db_seconds * 1000, 3),
+        "duration_ms": round(duration * 1000, 3),
+        "repeated_statements": repeated,
+    })
+    log.warning(f"{stats.method} {stats.path} ran {stats.statements} statements (limit {MAX_STATEMENTS_PER_REQUEST})")
+
+
+def instrument_engine(engine):
+    """
+    Install the hooks on `engine` (the sync_engine of an async one) - a no-op
+    unless one of the diagnostics is turned on.
+    """
+    if not (slow_queries_enabled() or statement_limit_enabled()):
+        return engine
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    return engine
+
+
+def snapshot(limit: Optional[int] = None) -> Dict:
+    with _lock:
+        slow = list(slow_queries)
+        flagged = list(flagged_requests)
+    if limit is not None:
+        slow, flagged = slow[-limit:], flagged[-limit:]
+    return {
+        "slow_query_ms": SLOW_QUERY_MS or None,
+        "sample_rate": SLOW_QUERY_SAMPLE_RATE,
+        "explain": SLOW_QUERY_EXPLAIN,
+        "max_statements_per_request": MAX_STATEMENTS_PER_REQUEST or None,
+        # Newest first
+        "slow_queries": slow[::-1],
+        "flagged_requests": flagged[::-1],
+    }
+
+
+def clear():
+    with _lock:
+        slow_queries.clear()
+        flagged_requests.clear()
+
+
+if statement_limit_enabled():
+    metrics.request_observers.append(_check_request)
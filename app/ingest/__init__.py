@@ -0,0 +1,12 @@
+"""
+Bulk ingestion of Open States / Plural bills and vote events.
+
+Documents are normalized in Python, staged into temp tables with COPY and
+merged into bills/vote_events with one upsert each per batch - the derived
+columns (latest_action_date, first_action_date, jurisdiction_level) are
+computed by those statements. A watermark (max updated_at seen) per source
+makes nightly runs incremental:
+
+    python -m app.ingest files ./openstates-export/
+    python -m app.ingest api --jurisdiction wa --jurisdiction or
+"""
@@ -0,0 +1,148 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+import argparse
+import logging
+import os
+import time
+
+from .load import get_watermark, merge_batch, set_watermark
+from .openstates import (
+    DEFAULT_API_URL, fetch_api, normalize_bill, normalize_vote_event, parse_timestamp, read_files,
+)
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+# Vote events staged per batch before it's flushed regardless of the bill count
+MAX_BATCH_VOTE_EVENTS = 20_000
+# Skipped ids listed in the log per batch
+MAX_LOGGED_SKIPPED = 20
+
+
+def ingest(
+    engine,
+    documents: Iterable[Dict],
+    source: str,
+    updated_since: Optional[datetime],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    default_jurisdiction_area_id: Optional[str] = None,
+) -> Counter:
+    """
+    Merge bills (and their votes) newer than `updated_since`, plus any standalone
+    vote events, one transaction per batch - then move the source's watermark
+    up to the newest updated_at seen, but not past a bill the merge skipped
+    (its jurisdiction area doesn't exist yet), so the next run retries it.
+    """
+    totals = Counter()
+    watermark = None
+    # Oldest updated_at of a skipped bill
+    oldest_skipped = None
+    bills: List[Dict] = []
+    vote_events: List[Dict] = []
+
+    def flush():
+        nonlocal oldest_skipped
+        start = time.perf_counter()
+        with engine.begin() as connection:
+            counts, skipped = merge_batch(connection, bills, vote_events)
+        totals.update(counts)
+        totals["batches"] += 1
+        log.info(f"Merged {len(bills)} bills, {len(vote_events)} vote events in {time.perf_counter() - start:.1f}s: {counts}")
+
+        if skipped["bills"]:
+            log.warning(
+                f"Skipped {len(skipped['bills'])} bills whose jurisdiction area doesn't exist, will retry: "
+                f"{[(row.id, row.jurisdiction_area_id) for row in skipped['bills'][:MAX_LOGGED_SKIPPED]]}"
+            )
+            for row in skipped["bills"]:
+                if row.updated_at is None:
+                    # Nothing to hold the watermark at - only the log (or a --full run) has it
+                    totals["bills_skipped_no_updated_at"] += 1
+                elif oldest_skipped is None or row.updated_at < oldest_skipped:
+                    oldest_skipped = row.updated_at
+        if skipped["vote_events"]:
+            log.warning(
+                f"Skipped {len(skipped['vote_events'])} vote events without a bill or start_date: "
+                f"{[(row.id, row.bill_id, row.reason) for row in skipped['vote_events'][:MAX_LOGGED_SKIPPED]]}"
+            )
+        bills.clear()
+        vote_events.clear()
+
+    for doc in documents:
+        # Standalone vote event files (bulk exports) rather than votes inside a bill
+        if "motion_text" in doc and "title" not in doc:
+            vote_events.append(normalize_vote_event(doc))
+        else:
+            bill, bill_vote_events = normalize_bill(doc, default_jurisdiction_area_id)
+            updated_at = parse_timestamp(bill["updated_at"])
+            if updated_since is not None and updated_at is not None and updated_at <= updated_since:
+                totals["bills_skipped"] += 1
+                continue
+            if updated_at is not None and (watermark is None or updated_at > watermark):
+                watermark = updated_at
+            bills.append(bill)
+            vote_events.extend(bill_vote_events)
+        totals["documents"] += 1
+
+        if len(bills) >= batch_size or len(vote_events) >= MAX_BATCH_VOTE_EVENTS:
+            flush()
+
+    if bills or vote_events:
+        flush()
+
+    if oldest_skipped is not None and watermark is not None and watermark >= oldest_skipped:
+        # Just before the oldest skipped bill - the next run reads it (and anything
+        # merged after it, which the merge leaves untouched) again
+        watermark = oldest_skipped - timedelta(microseconds=1)
+        log.warning(f"Holding the {source} watermark at {watermark} for the skipped bills")
+
+    # Only once everything is in - a failed run starts over from the old watermark
+    with engine.begin() as connection:
+        set_watermark(connection, source, watermark)
+    log.info(f"Watermark for {source} is now {watermark or updated_since}")
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load Open States / Plural bills and vote events.")
+    parser.add_argument("--source", default="openstates", help="Name the watermark is kept under")
+    parser.add_argument("--full", action="store_true", help="Ignore the watermark and load everything")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Bills per transaction")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    files_parser = subparsers.add_parser("files", help="Read .json/.jsonl files or directories of them")
+    files_parser.add_argument("paths", nargs="+")
+    files_parser.add_argument(
+        "--jurisdiction-area-id", help="For bills without a jurisdiction, e.g. ocd-division/country:us/state:wa"
+    )
+
+    api_parser = subparsers.add_parser("api", help="Page through the Open States v3 API (or a local stand-in)")
+    api_parser.add_argument("--jurisdiction", action="append", required=True, help="e.g. wa, or repeat it")
+    api_parser.add_argument("--api-url", default=os.getenv("PLURAL_API_URL", DEFAULT_API_URL))
+    args = parser.parse_args()
+
+    from ..database.database import create_schema, get_engine
+
+    engine = get_engine()
+    # The ingest tables (and the triggers the merges rely on) have to exist
+    create_schema(engine)
+    with engine.connect() as connection:
+        updated_since = None if args.full else get_watermark(connection, args.source)
+    log.info(f"Ingesting {args.source} updated since {updated_since}")
+
+    if args.command == "files":
+        documents = read_files(args.paths)
+        default_jurisdiction_area_id = args.jurisdiction_area_id
+    else:
+        documents = fetch_api(args.api_url, os.getenv("PLURAL_API_KEY"), args.jurisdiction, updated_since)
+        default_jurisdiction_area_id = None
+
+    start = time.perf_counter()
+    totals = ingest(engine, documents, args.source, updated_since, args.batch_size, default_jurisdiction_area_id)
+    log.info(f"Ingested {dict(totals)} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    main()
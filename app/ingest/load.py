@@ -0,0 +1,213 @@
+"""
+COPY normalized documents into temp staging tables and merge them into
+bills/vote_events with set-based upserts.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import csv
+import io
+import json
+
+from sqlalchemy import text
+
+
+def _timestamp(expr: str) -> str:
+    # Action dates as given - just the leading date[Thh:mm[:ss]], some have offsets or junk
+    return (
+        f"substring({expr} from '^\\d{{4}}-\\d{{2}}-\\d{{2}}(?:[T ]\\d{{2}}:\\d{{2}}(?:[:]\\d{{2}})?)?')::timestamp"
+    )
+
+
+STAGING_DDL = [
+    "CREATE TEMP TABLE IF NOT EXISTS ingest_bills (doc jsonb NOT NULL) ON COMMIT DELETE ROWS",
+    "CREATE TEMP TABLE IF NOT EXISTS ingest_vote_events (doc jsonb NOT NULL) ON COMMIT DELETE ROWS",
+]
+
+BILL_JSONB_COLUMNS = [
+    "from_organization", "classification", "subject", "abstracts", "other_titles", "other_identifiers",
+    "actions", "sponsorships", "related_bills", "versions", "documents", "citations", "sources", "extras",
+]
+
+# Newest copy of each staged bill whose jurisdiction exists. created_at, latest_vote_date
+# and ai_summary are ours, so an update leaves them alone - and unchanged bills aren't touched.
+MERGE_BILLS_SQL = text(
+    f"""
+    INSERT INTO bills (
+        id, title, canonical_id, jurisdiction_area_id, legislative_session,
+        {", ".join(BILL_JSONB_COLUMNS)},
+        latest_action_date, first_action_date, updated_at, created_at, jurisdiction_level
+    )
+    SELECT DISTINCT ON (s.doc->>'id')
+        s.doc->>'id',
+        s.doc->>'title',
+        s.doc->>'canonical_id',
+        s.doc->>'jurisdiction_area_id',
+        s.doc->>'legislative_session',
+        {", ".join(f"s.doc->'{c}'" for c in BILL_JSONB_COLUMNS)},
+        (SELECT max({_timestamp("a->>'date'")}) FROM jsonb_array_elements(s.doc->'actions') a),
+        (SELECT min({_timestamp("a->>'date'")}) FROM jsonb_array_elements(s.doc->'actions') a),
+        (s.doc->>'updated_at')::timestamp,
+        coalesce((s.doc->>'created_at')::timestamp, now() AT TIME ZONE 'utc'),
+        CASE
+            WHEN s.doc->>'jurisdiction_area_id' = 'ocd-division/country:us' THEN 'federal'
+            WHEN s.doc->>'jurisdiction_area_id' ~ '^ocd-division/country:us/(state|district|territory):[a-z]+$'
+                THEN 'state'
+            ELSE 'local'
+        END
+    FROM ingest_bills s
+    WHERE EXISTS (SELECT 1 FROM areas WHERE areas.id = s.doc->>'jurisdiction_area_id')
+    ORDER BY s.doc->>'id', (s.doc->>'updated_at')::timestamp DESC NULLS LAST
+    ON CONFLICT (id) DO UPDATE SET
+        title = EXCLUDED.title,
+        canonical_id = EXCLUDED.canonical_id,
+        jurisdiction_area_id = EXCLUDED.jurisdiction_area_id,
+        legislative_session = EXCLUDED.legislative_session,
+        {", ".join(f"{c} = EXCLUDED.{c}" for c in BILL_JSONB_COLUMNS)},
+        latest_action_date = EXCLUDED.latest_action_date,
+        first_action_date = EXCLUDED.first_action_date,
+        updated_at = EXCLUDED.updated_at,
+        jurisdiction_level = EXCLUDED.jurisdiction_level
+    WHERE bills.updated_at IS DISTINCT FROM EXCLUDED.updated_at
+    RETURNING (xmax = 0) AS inserted
+    """
+)
+
+VOTE_EVENT_COLUMNS = [
+    "id", "bill_id", "identifier", "motion_text", "motion_classification", "start_date", "result",
+    "chamber", "legislative_session", "votes", "counts", "sources", "extras",
+]
+_vote_event_jsonb = {"motion_classification", "votes", "counts", "sources", "extras"}
+
+# The bills triggers (vote_records, latest_vote_date) only fire for rows that changed
+MERGE_VOTE_EVENTS_SQL = text(
+    f"""
+    INSERT INTO vote_events ({", ".join(VOTE_EVENT_COLUMNS)})
+    SELECT DISTINCT ON (s.doc->>'id')
+        {", ".join(
+            f"s.doc->'{c}'" if c in _vote_event_jsonb
+            else f"(s.doc->>'{c}')::timestamp" if c == "start_date"
+            else f"s.doc->>'{c}'"
+            for c in VOTE_EVENT_COLUMNS
+        )}
+    FROM ingest_vote_events s
+    WHERE EXISTS (SELECT 1 FROM bills WHERE bills.id = s.doc->>'bill_id')
+    AND s.doc->>'start_date' IS NOT NULL
+    ORDER BY s.doc->>'id'
+    ON CONFLICT (id) DO UPDATE SET
+        {", ".join(f"{c} = EXCLUDED.{c}" for c in VOTE_EVENT_COLUMNS if c != "id")}
+    WHERE (vote_events.*) IS DISTINCT FROM (EXCLUDED.*)
+    RETURNING (xmax = 0) AS inserted
+    """
+)
+
+# What the merges above leave out (and why) - counted and logged, and a skipped
+# bill holds the watermark back so the next run retries it
+SKIPPED_BILLS_SQL = text(
+    """
+    SELECT DISTINCT ON (s.doc->>'id')
+        s.doc->>'id' AS id,
+        s.doc->>'jurisdiction_area_id' AS jurisdiction_area_id,
+        (s.doc->>'updated_at')::timestamp AS updated_at
+    FROM ingest_bills s
+    WHERE NOT EXISTS (SELECT 1 FROM areas WHERE areas.id = s.doc->>'jurisdiction_area_id')
+    ORDER BY s.doc->>'id', (s.doc->>'updated_at')::timestamp DESC NULLS LAST
+    """
+)
+
+# Run after MERGE_BILLS_SQL, so bills merged from this batch count as existing
+SKIPPED_VOTE_EVENTS_SQL = text(
+    """
+    SELECT DISTINCT ON (s.doc->>'id')
+        s.doc->>'id' AS id,
+        s.doc->>'bill_id' AS bill_id,
+        CASE WHEN s.doc->>'start_date' IS NULL THEN 'no_start_date' ELSE 'no_bill' END AS reason
+    FROM ingest_vote_events s
+    WHERE s.doc->>'start_date' IS NULL
+    OR NOT EXISTS (SELECT 1 FROM bills WHERE bills.id = s.doc->>'bill_id')
+    ORDER BY s.doc->>'id'
+    """
+)
+
+# Votes a bill no longer has, for bills that came with their complete list of votes
+DELETE_STALE_VOTE_EVENTS_SQL = text(
+    """
+    DELETE FROM vote_events ve
+    USING ingest_bills s
+    WHERE (s.doc->>'votes_included')::boolean
+    AND ve.bill_id = s.doc->>'id'
+    AND NOT EXISTS (SELECT 1 FROM ingest_vote_events v WHERE v.doc->>'id' = ve.id)
+    """
+)
+
+
+def _copy_documents(connection, table: str, docs: List[Dict]):
+    """
+    COPY documents into a staging table, one jsonb value per row.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL, lineterminator="\n")
+    for doc in docs:
+        writer.writerow([json.dumps(doc, default=str)])
+    buffer.seek(0)
+
+    # Raw psycopg2 cursor on the same connection (and transaction)
+    with connection.connection.dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {table} (doc) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _counts(result) -> Dict[str, int]:
+    inserted = [row.inserted for row in result]
+    return {"inserted": sum(inserted), "updated": len(inserted) - sum(inserted)}
+
+
+def merge_batch(connection, bills: List[Dict], vote_events: List[Dict]) -> Tuple[Dict[str, int], Dict[str, List]]:
+    """
+    Stage and merge one batch, inside the caller's transaction. Returns the
+    counts, and the rows the merges skipped - {"bills": [(id,
+    jurisdiction_area_id, updated_at)], "vote_events": [(id, bill_id, reason)]}.
+    """
+    for statement in STAGING_DDL:
+        connection.execute(text(statement))
+    _copy_documents(connection, "ingest_bills", bills)
+    _copy_documents(connection, "ingest_vote_events", vote_events)
+
+    skipped_bills = connection.execute(SKIPPED_BILLS_SQL).all()
+    bill_counts = _counts(connection.execute(MERGE_BILLS_SQL))
+    skipped_vote_events = connection.execute(SKIPPED_VOTE_EVENTS_SQL).all()
+    vote_counts = _counts(connection.execute(MERGE_VOTE_EVENTS_SQL))
+    deleted = connection.execute(DELETE_STALE_VOTE_EVENTS_SQL).rowcount
+
+    # Clear the staging tables for the next batch on this connection
+    connection.execute(text("TRUNCATE ingest_bills, ingest_vote_events"))
+    counts = {
+        "bills_inserted": bill_counts["inserted"],
+        "bills_updated": bill_counts["updated"],
+        "bills_skipped_no_area": len(skipped_bills),
+        "vote_events_inserted": vote_counts["inserted"],
+        "vote_events_updated": vote_counts["updated"],
+        "vote_events_deleted": deleted,
+        "vote_events_skipped": len(skipped_vote_events),
+    }
+    return counts, {"bills": skipped_bills, "vote_events": skipped_vote_events}
+
+
+def get_watermark(connection, source: str) -> Optional[datetime]:
+    return connection.execute(
+        text("SELECT updated_since FROM ingest_watermarks WHERE source = :source"), {"source": source}
+    ).scalar()
+
+
+def set_watermark(connection, source: str, updated_since: Optional[datetime]):
+    # Never moves backwards, e.g. after a --full run over older files
+    connection.execute(
+        text(
+            """
+            INSERT INTO ingest_watermarks (source, updated_since, last_run_at)
+            VALUES (:source, :updated_since, now() AT TIME ZONE 'utc')
+            ON CONFLICT (source) DO UPDATE SET
+                updated_since = greatest(ingest_watermarks.updated_since, EXCLUDED.updated_since),
+                last_run_at = EXCLUDED.last_run_at
+            """
+        ),
+        {"source": source, "updated_since": updated_since},
+    )
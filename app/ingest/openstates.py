@@ -0,0 +1,195 @@
+"""
+Reading Open States-format JSON - API v3 pages, bulk/scrape files - and
+normalizing it into documents shaped like our bills and vote_events rows.
+"""
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+import json
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+DEFAULT_API_URL = "https://v3.openstates.org"
+API_PER_PAGE = 20
+API_INCLUDES = [
+    "sponsorships", "abstracts", "other_titles", "other_identifiers", "actions",
+    "sources", "documents", "versions", "votes", "related_bills",
+]
+API_MAX_RETRIES = 5
+
+BILL_JSONB_LISTS = [
+    "classification", "subject", "abstracts", "other_titles", "other_identifiers", "actions",
+    "sponsorships", "related_bills", "versions", "documents", "citations", "sources",
+]
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """
+    Naive UTC datetime from an Open States date/datetime string, like the DB stores them.
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _timestamp_text(value: Optional[str]) -> Optional[str]:
+    parsed = parse_timestamp(value)
+    return parsed.isoformat() if parsed is not None else None
+
+
+def jurisdiction_area_id(jurisdiction) -> Optional[str]:
+    """
+    ocd-jurisdiction/country:us/state:wa/government -> ocd-division/country:us/state:wa
+    """
+    if isinstance(jurisdiction, dict):
+        jurisdiction = jurisdiction.get("id")
+    if not jurisdiction:
+        return None
+    if jurisdiction.startswith("ocd-jurisdiction/"):
+        jurisdiction = "ocd-division/" + jurisdiction[len("ocd-jurisdiction/"):]
+        jurisdiction = jurisdiction.rsplit("/", 1)[0] if jurisdiction.endswith("/government") else jurisdiction
+    return jurisdiction
+
+
+def _list(value) -> List:
+    return value if isinstance(value, list) else []
+
+
+def normalize_vote_event(vote: Dict, bill_id: Optional[str] = None, session: Optional[str] = None) -> Dict:
+    organization = vote.get("organization") or {}
+    return {
+        "id": vote["id"],
+        "bill_id": bill_id or vote.get("bill_id"),
+        "identifier": vote.get("identifier") or "",
+        "motion_text": vote.get("motion_text") or "",
+        "motion_classification": _list(vote.get("motion_classification")),
+        "start_date": _timestamp_text(vote.get("start_date")),
+        "result": vote.get("result") or "",
+        "chamber": organization.get("classification") or vote.get("chamber") or "",
+        "legislative_session": vote.get("legislative_session") or session or "",
+        # vote_records is derived from voter_id (see derived.py)
+        "votes": [
+            {
+                "option": v.get("option"),
+                "voter_name": v.get("voter_name"),
+                "voter_id": v.get("voter_id") or (v.get("voter") or {}).get("id"),
+            }
+            for v in _list(vote.get("votes"))
+        ],
+        "counts": _list(vote.get("counts")),
+        "sources": _list(vote.get("sources")),
+        "extras": vote.get("extras") or {},
+    }
+
+
+def normalize_bill(bill: Dict, default_jurisdiction_area_id: Optional[str] = None) -> Tuple[Dict, List[Dict]]:
+    """
+    (bill document, its vote event documents) - the derived dates and
+    jurisdiction_level are left to the merge statement.
+    """
+    session = bill.get("session") or bill.get("legislative_session") or ""
+    doc = {
+        "id": bill["id"],
+        "title": bill.get("title") or "",
+        "canonical_id": bill.get("identifier") or bill.get("canonical_id") or "",
+        "jurisdiction_area_id": (
+            jurisdiction_area_id(bill.get("jurisdiction"))
+            or bill.get("jurisdiction_area_id")
+            or default_jurisdiction_area_id
+        ),
+        "legislative_session": session,
+        "from_organization": bill.get("from_organization") or {},
+        "extras": bill.get("extras") or {},
+        "updated_at": _timestamp_text(bill.get("updated_at")),
+        "created_at": _timestamp_text(bill.get("created_at")),
+        # Only then is the bill's list of votes complete, so missing ones can be removed
+        "votes_included": "votes" in bill,
+    }
+    for key in BILL_JSONB_LISTS:
+        doc[key] = _list(bill.get(key))
+
+    votes = [normalize_vote_event(v, bill["id"], session) for v in _list(bill.get("votes"))]
+    return doc, votes
+
+
+def _documents(content) -> Iterator[Dict]:
+    # An API page, a list of objects, or a single object
+    if isinstance(content, dict) and isinstance(content.get("results"), list):
+        yield from content["results"]
+    elif isinstance(content, list):
+        yield from content
+    elif isinstance(content, dict):
+        yield content
+
+
+def read_files(paths: Iterable[str]) -> Iterator[Dict]:
+    """
+    Raw documents from .json (objects, lists or API pages) and .jsonl/.ndjson
+    files, or directories of them.
+    """
+    for path in map(Path, paths):
+        files = sorted(
+            p for p in path.rglob("*") if p.suffix in (".json", ".jsonl", ".ndjson")
+        ) if path.is_dir() else [path]
+        for file in files:
+            with open(file) as f:
+                if file.suffix == ".json":
+                    yield from _documents(json.load(f))
+                else:
+                    for line in f:
+                        if line.strip():
+                            yield from _documents(json.loads(line))
+
+
+def fetch_api(
+    api_url: str,
+    api_key: str,
+    jurisdictions: List[str],
+    updated_since: Optional[datetime],
+    per_page: int = API_PER_PAGE,
+) -> Iterator[Dict]:
+    """
+    Bills (with their votes etc.) from the Open States v3 API - or a local
+    stand-in serving the same /bills pages - oldest update first.
+    """
+    for jurisdiction in jurisdictions:
+        page = 1
+        max_page = 1
+        while page <= max_page:
+            params = [
+                ("jurisdiction", jurisdiction),
+                ("sort", "updated_asc"),
+                ("page", page),
+                ("per_page", per_page),
+            ] + [("include", include) for include in API_INCLUDES]
+            if updated_since is not None:
+                params.append(("updated_since", updated_since.isoformat()))
+
+            content = _get_json(f"{api_url.rstrip('/')}/bills?{urlencode(params)}", api_key)
+            yield from content.get("results", [])
+            max_page = (content.get("pagination") or {}).get("max_page") or page
+            log.info(f"Fetched {jurisdiction} page {page}/{max_page}")
+            page += 1
+
+
+def _get_json(url: str, api_key: str):
+    for attempt in range(API_MAX_RETRIES):
+        try:
+            with urlopen(Request(url, headers={"X-API-KEY": api_key or ""}), timeout=60) as response:
+                return json.load(response)
+        except HTTPError as e:
+            # Rate limited or a hiccup on their end - back off and retry
+            if e.code not in (429, 500, 502, 503, 504) or attempt == API_MAX_RETRIES - 1:
+                raise
+            time.sleep(2 ** attempt)
@@ -1,9 +1,12 @@
+from contextlib import asynccontextmanager
 import logging
 from logging.handlers import TimedRotatingFileHandler
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
+from . import warmup
+from .metrics import MetricsMiddleware
 from .api import (
     router_people,
     router_status,
@@ -39,7 +42,16 @@ logger.addHandler(handler)
 
 load_dotenv()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs before the worker accepts requests - see app/warmup.py
+    await warmup.startup()
+    yield
+    await warmup.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -48,6 +60,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so the latency covers the other middleware too
+app.add_middleware(MetricsMiddleware)
 
 
 app.include_router(router_people)
@@ -0,0 +1,288 @@
+"""
+Per-route request metrics in the Prometheus text format (GET /api/status/metrics).
+
+MetricsMiddleware times every request and, through the engine event hooks
+installed by instrument_engine, counts the SQL statements it ran, their total
+time, the rows they returned and how long it waited for a pooled connection.
+Everything is per worker process - with several uvicorn workers each scrape
+sees the worker that answered it, so scrape each worker or aggregate by `pid`.
+"""
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+# Statements run outside of a request (startup DDL, background work)
+NO_ROUTE = "(none)"
+# Requests that didn't match a route - not labelled by path, that's unbounded
+UNMATCHED_ROUTE = "(unmatched)"
+
+
+class RequestStats:
+    __slots__ = (
+        "method", "path", "route", "statements", "db_seconds", "rows", "pool_wait_seconds", "statement_counts",
+    )
+
+    def __init__(self, method: str = "", path: str = ""):
+        self.method = method
+        self.path = path
+        self.route = UNMATCHED_ROUTE
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+        self.pool_wait_seconds = 0.0
+        # Counter of SQL texts, only kept while the diagnostics are on
+        self.statement_counts = None
+
+
+# Set by the middleware; threadpool calls (ThreadedSession) copy the context, so
+# statements run there are still counted against the request
+_current: ContextVar[Optional[RequestStats]] = ContextVar("repcheck_request_stats", default=None)
+
+
+def current_request() -> Optional[RequestStats]:
+    return _current.get()
+
+
+# Called with (stats, status, duration) after every request - see app/diagnostics.py
+request_observers: List[Callable[[RequestStats, int, float], None]] = []
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """
+    The few metric families we keep, labelled by (method, route[, status]).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[Tuple[str, str, str], int] = {}
+        self.durations: Dict[Tuple[str, str], Histogram] = {}
+        self.statements: Dict[Tuple[str, str], Histogram] = {}
+        self.db_seconds: Dict[Tuple[str, str], float] = {}
+        self.rows: Dict[Tuple[str, str], int] = {}
+        self.pool_wait_seconds: Dict[Tuple[str, str], float] = {}
+        self.pools = {}
+        # Callables yielding extra exposition lines, e.g. the admission controller's
+        self.collectors = []
+
+    def observe_request(self, method: str, status: int, duration: float, stats: RequestStats):
+        key = (method, stats.route)
+        with self._lock:
+            self.requests[key + (str(status),)] = self.requests.get(key + (str(status),), 0) + 1
+            self.durations.setdefault(key, Histogram(DURATION_BUCKETS)).observe(duration)
+            self.statements.setdefault(key, Histogram(STATEMENT_BUCKETS)).observe(stats.statements)
+            self._add(key, stats.db_seconds, stats.rows, stats.pool_wait_seconds)
+
+    def observe_background(self, db_seconds: float = 0.0, rows: int = 0, pool_wait_seconds: float = 0.0):
+        with self._lock:
+            self._add(("", NO_ROUTE), db_seconds, rows, pool_wait_seconds)
+
+    def _add(self, key, db_seconds, rows, pool_wait_seconds):
+        self.db_seconds[key] = self.db_seconds.get(key, 0.0) + db_seconds
+        self.rows[key] = self.rows.get(key, 0) + rows
+        self.pool_wait_seconds[key] = self.pool_wait_seconds.get(key, 0.0) + pool_wait_seconds
+
+    def render(self) -> str:
+        lines = []
+        pid = str(os.getpid())
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def sample(name, labels, value):
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            lines.append(f"{name}{{{label_text}}} {_number(value)}")
+
+        def route_labels(key):
+            return {"pid": pid, "method": key[0], "route": key[1]}
+
+        def histograms(name, values):
+            for key, histogram in sorted(values.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    sample(f"{name}_bucket", {**route_labels(key), "le": _number(bound)}, cumulative)
+                sample(f"{name}_bucket", {**route_labels(key), "le": "+Inf"}, histogram.count)
+                sample(f"{name}_sum", route_labels(key), histogram.sum)
+                sample(f"{name}_count", route_labels(key), histogram.count)
+
+        with self._lock:
+            family("repcheck_http_requests_total", "counter", "Requests handled, by route and status.")
+            for key, value in sorted(self.requests.items()):
+                sample("repcheck_http_requests_total", {**route_labels(key), "status": key[2]}, value)
+
+            family("repcheck_http_request_duration_seconds", "histogram", "Request latency, until the response is sent.")
+            histograms("repcheck_http_request_duration_seconds", self.durations)
+
+            family("repcheck_http_request_db_statements", "histogram", "SQL statements run per request.")
+            histograms("repcheck_http_request_db_statements", self.statements)
+
+            family("repcheck_db_seconds_total", "counter", "Time spent executing SQL statements.")
+            for key, value in sorted(self.db_seconds.items()):
+                sample("repcheck_db_seconds_total", route_labels(key), value)
+
+            family("repcheck_db_rows_total", "counter", "Rows returned by SQL statements.")
+            for key, value in sorted(self.rows.items()):
+                sample("repcheck_db_rows_total", route_labels(key), value)
+
+            family("repcheck_db_pool_wait_seconds_total", "counter", "Time spent waiting for (or opening) a pooled connection.")
+            for key, value in sorted(self.pool_wait_seconds.items()):
+                sample("repcheck_db_pool_wait_seconds_total", route_labels(key), value)
+
+            pools = dict(self.pools)
+
+        family("repcheck_db_pool_connections", "gauge", "Pooled connections by state.")
+        for name, pool in sorted(pools.items()):
+            checked_out = pool.checkedout()
+            sample("repcheck_db_pool_connections", {"pid": pid, "engine": name, "state": "checked_out"}, checked_out)
+            sample("repcheck_db_pool_connections", {"pid": pid, "engine": name, "state": "idle"}, pool.checkedin())
+            sample("repcheck_db_pool_connections", {"pid": pid, "engine": name, "state": "overflow"}, max(0, pool.overflow()))
+        family("repcheck_db_pool_size", "gauge", "Configured pool size (before overflow).")
+        for name, pool in sorted(pools.items()):
+            sample("repcheck_db_pool_size", {"pid": pid, "engine": name}, pool.size())
+
+        for collect in list(self.collectors):
+            lines.extend(collect())
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (rather than BaseHTTPMiddleware) so the route runs in
+    the same context as the timer - streamed bodies included.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats(scope["method"], scope["path"])
+        token = _current.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router puts the matched route on the scope
+            route = scope.get("route")
+            if route is not None:
+                stats.route = getattr(route, "path", UNMATCHED_ROUTE)
+            duration = time.perf_counter() - start
+            registry.observe_request(scope["method"], status, duration, stats)
+            for observer in request_observers:
+                observer(stats, status, duration)
+            _current.reset(token)
+
+
+def _observe_pool_wait(seconds: float):
+    stats = _current.get()
+    if stats is not None:
+        stats.pool_wait_seconds += seconds
+    else:
+        registry.observe_background(pool_wait_seconds=seconds)
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that times checkouts - there's no pool event for "started
+    waiting", only for having got a connection.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _observe_pool_wait(time.perf_counter() - start)
+
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _observe_pool_wait(time.perf_counter() - start)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("repcheck_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["repcheck_query_start"].pop()
+    # Only statements that return rows; rowcount is -1 when the driver doesn't know (yet)
+    rows = max(cursor.rowcount, 0) if cursor.description is not None else 0
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+        stats.rows += rows
+    else:
+        registry.observe_background(db_seconds=elapsed, rows=rows)
+
+
+def _handle_error(exception_context):
+    # The statement failed, so after_cursor_execute won't pop its start time
+    starts = exception_context.connection.info.get("repcheck_query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def instrument_engine(engine, name: str):
+    """
+    Count statements/DB time/rows on `engine` (the sync_engine of an async one)
+    and report its pool. Create it with poolclass=TimedQueuePool (or
+    TimedAsyncAdaptedQueuePool) to also get the checkout wait.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    with registry._lock:
+        registry.pools[name] = engine.pool
+    return engine
@@ -0,0 +1,78 @@
+"""
+Worker start-up: the optional schema step, then a warm-up (pooled connections,
+in-process indexes) that runs before the worker accepts traffic, plus the state
+GET /api/status/ready reports.
+"""
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import logging
+import os
+import time
+
+from . import cache
+from .database.database import create_schema, warm_async_pool, warm_pool
+
+log = logging.getLogger(__name__)
+
+# Opt-in - run create_all/derived DDL on start-up (dev); otherwise it's an explicit
+# step: python -m app.database.derived schema
+CREATE_SCHEMA_ON_STARTUP = os.getenv("REPCHECK_CREATE_SCHEMA", "0") == "1"
+WARMUP_ENABLED = os.getenv("REPCHECK_WARMUP", "1") == "1"
+# How long start-up waits for the warm-up - after that the worker serves anyway
+# and keeps warming in the background (caches also load lazily on first use)
+WARMUP_TIMEOUT = float(os.getenv("REPCHECK_WARMUP_TIMEOUT", "30"))
+WARMUP_RETRY_SECONDS = 5.0
+
+state = {
+    "warmed": not WARMUP_ENABLED,
+    "warmup_seconds": None,
+    "warmed_caches": [],
+    "pool_connections": 0,
+    "error": None,
+}
+
+_background_task = None
+
+
+def _warm():
+    start = time.perf_counter()
+    state["pool_connections"] = warm_pool()
+    state["warmed_caches"] = cache.warm()
+    state["warmup_seconds"] = round(time.perf_counter() - start, 3)
+    state["warmed"] = True
+    state["error"] = None
+    log.info(
+        f"Warmed up in {state['warmup_seconds']}s: {state['pool_connections']} connections, "
+        f"caches {state['warmed_caches']}"
+    )
+
+
+async def _warm_until_done():
+    while not state["warmed"]:
+        try:
+            await warm_async_pool()
+            await run_in_threadpool(_warm)
+        except Exception as e:
+            state["error"] = str(e)
+            log.exception(f"Warm-up failed, retrying in {WARMUP_RETRY_SECONDS}s")
+            await asyncio.sleep(WARMUP_RETRY_SECONDS)
+
+
+async def startup():
+    global _background_task
+    if CREATE_SCHEMA_ON_STARTUP:
+        await run_in_threadpool(create_schema)
+    if state["warmed"]:
+        return
+
+    _background_task = asyncio.create_task(_warm_until_done())
+    try:
+        # shield - on a timeout keep warming, just stop holding up start-up
+        await asyncio.wait_for(asyncio.shield(_background_task), timeout=WARMUP_TIMEOUT)
+    except asyncio.TimeoutError:
+        log.warning(f"Warm-up not done after {WARMUP_TIMEOUT}s, serving and warming in the background")
+
+
+async def shutdown():
+    if _background_task is not None and not _background_task.done():
+        _background_task.cancel()
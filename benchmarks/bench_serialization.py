@@ -0,0 +1,139 @@
+"""
+Per-page serialization cost of a /api/zipcodes/{zip_code}/bills page - the old
+BillWithVotes/PaginatedBills + FastAPI response_model path vs. serializing row
+dicts straight to JSON with orjson. No database needed.
+
+    python -m benchmarks.bench_serialization --page-size 20 --votes-per-bill 3
+"""
+from datetime import datetime, timedelta
+import argparse
+import json
+import random
+import timeit
+import warnings
+
+from pydantic import TypeAdapter
+
+from app.api.bills import PaginatedBills
+from app.api.responses import encode_json
+from app.database.models import Bill, BillWithVotes, VoteEvent
+
+
+def fake_bill(i: int, rng: random.Random):
+    when = datetime(2024, 1, 1) + timedelta(days=rng.randint(0, 700))
+    return {
+        "id": f"ocd-bill/{i:08d}",
+        "title": f"An act relating to item {i} " * 3,
+        "canonical_id": f"HB {i}",
+        "jurisdiction_area_id": "ocd-division/country:us/state:wa",
+        "legislative_session": "2025-2026",
+        "from_organization": {"id": "ocd-organization/1", "name": "House", "classification": "lower"},
+        "classification": ["bill"],
+        "subject": [{"name": f"Subject {j}"} for j in range(5)],
+        "abstracts": [{"abstract": "Lorem ipsum dolor sit amet. " * 20, "note": "summary"}],
+        "other_titles": [{"title": f"Other title {j}", "note": ""} for j in range(3)],
+        "other_identifiers": [f"SB {i}"],
+        "actions": [
+            {
+                "date": (when - timedelta(days=j)).isoformat(),
+                "description": "Referred to committee on appropriations",
+                "classification": ["referral-committee"],
+                "organization": {"name": "House"},
+            }
+            for j in range(30)
+        ],
+        "sponsorships": [
+            {"name": f"Rep {j}", "primary": j == 0, "classification": "sponsor", "person": {"id": f"ocd-person/{j}"}}
+            for j in range(15)
+        ],
+        "related_bills": [],
+        "versions": [
+            {"note": f"Version {j}", "date": when.date().isoformat(),
+             "links": [{"url": f"https://example.org/{i}/{j}.pdf", "media_type": "application/pdf"}]}
+            for j in range(5)
+        ],
+        "documents": [{"note": f"Fiscal note {j}", "links": [{"url": f"https://example.org/{i}/doc{j}"}]} for j in range(5)],
+        "citations": [],
+        "sources": [{"url": f"https://example.org/bills/{i}"}],
+        "extras": {"impact_clause": "Lorem ipsum " * 10},
+        "latest_action_date": when,
+        "first_action_date": when - timedelta(days=29),
+        "latest_vote_date": when,
+        "updated_at": when,
+        "created_at": when,
+        "jurisdiction_level": "state",
+        "ai_summary": "Summary " * 50,
+    }
+
+
+def fake_vote(bill_id: str, j: int):
+    return {
+        "id": f"{bill_id}/vote/{j}",
+        "bill_id": bill_id,
+        "identifier": f"Roll call {j}",
+        "motion_text": "Final passage",
+        "motion_classification": ["passage"],
+        "start_date": datetime(2025, 3, 1, 12, 0),
+        "result": "pass",
+        "chamber": "lower",
+        "legislative_session": "2025-2026",
+        "votes": [{"option": "yes", "voter_name": f"Rep {k}", "voter_id": f"ocd-person/{k}"} for k in range(98)],
+        "counts": [{"option": "yes", "value": 60}, {"option": "no", "value": 38}],
+        "sources": [{"url": "https://example.org/vote"}],
+        "extras": {},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--votes-per-bill", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    # BillWithVotes(**bill.dict()) is what the route did, deprecation warning and all
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    rng = random.Random(0)
+    bills = [fake_bill(i, rng) for i in range(args.page_size)]
+    votes_by_bill = {b["id"]: [fake_vote(b["id"], j) for j in range(args.votes_per_bill)] for b in bills}
+    # What the ORM used to hand back
+    bill_rows = [Bill(**b) for b in bills]
+    vote_rows = {bill_id: [VoteEvent(**v) for v in votes] for bill_id, votes in votes_by_bill.items()}
+    adapter = TypeAdapter(PaginatedBills)
+
+    def before():
+        bills_with_votes = [BillWithVotes(**b.dict(), votes=vote_rows[b.id]) for b in bill_rows]
+        page = PaginatedBills(
+            total_bills=1000, total_pages=50, current_page=1, page_size=args.page_size, bills=bills_with_votes
+        )
+        # What FastAPI does with a response_model: dump the returned model, validate it
+        # again, serialize to JSON-able python, then JSONResponse's json.dumps
+        content = adapter.dump_python(adapter.validate_python(page.model_dump()), mode="json")
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+    def after():
+        return encode_json({
+            "total_bills": 1000,
+            "total_pages": 50,
+            "current_page": 1,
+            "page_size": args.page_size,
+            "bills": [
+                dict({name: bill[name] for name in Bill.model_fields}, votes=votes_by_bill[bill["id"]])
+                for bill in bills
+            ],
+            "next_cursor": None,
+        })
+
+    # Both paths must produce the same document
+    assert json.loads(before()) == json.loads(after())
+
+    results = {}
+    for name, fn in (("before", before), ("after", after)):
+        per_page = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+        results[name] = per_page
+        print(f"{name:>6}: {per_page * 1000:8.2f} ms/page  ({len(fn()) / 1024:.0f} KiB)")
+    print(f"speedup: {results['before'] / results['after']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
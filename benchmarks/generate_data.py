@@ -0,0 +1,339 @@
+"""
+Fill a local PostGIS database with synthetic, but realistically shaped, data
+for the load benchmark: states, congressional districts and ZIP codes (areas),
+their representatives (people, person_area), bills with actions/sponsors/
+versions, roll-call votes, and precinct results. Everything is generated
+inside Postgres from a seed, so the same arguments give the same data.
+
+Use a scratch database - it creates the schema and --reset wipes every table:
+
+    createdb repcheck_bench && psql repcheck_bench -c "CREATE EXTENSION postgis"
+    POSTGRES_DB=repcheck_bench python -m benchmarks.generate_data --scale 1 --reset
+    POSTGRES_DB=repcheck_bench uvicorn app.main:app --workers 4
+    python -m benchmarks.load_test --manifest bench_manifest.json
+"""
+from pathlib import Path
+from urllib.parse import quote
+import argparse
+import json
+import logging
+import math
+import os
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+from sqlmodel import SQLModel
+
+from app.database import models  # registers the tables on SQLModel.metadata
+from app.database.derived import ensure_derived_schema
+
+log = logging.getLogger(__name__)
+
+SEARCH_WORDS = [
+    "tax", "education", "health", "transportation", "water", "energy", "housing", "veterans",
+    "agriculture", "firearms", "elections", "privacy", "broadband", "wildfire", "insurance",
+    "pharmacy", "childcare", "police", "budget", "tribal",
+]
+
+# In generation order - truncated in reverse by --reset
+TABLES = [
+    "areas", "people", "person_area", "bills", "vote_events", "precinct_election_result_area",
+]
+
+STATE_SIZE_DEGREES = 5.0
+
+GENERATE_SQL = [
+    "SELECT setseed(:seed)",
+    # --- Areas ---
+    """
+    CREATE TEMP TABLE bench_states AS
+    SELECT i, chr(97 + i / 26) || chr(97 + i % 26) AS code,
+        24 + (i / 10) * 5.2 AS lat0, -125 + (i % 10) * 5.9 AS lon0
+    FROM generate_series(0, :states - 1) i
+    """,
+    """
+    INSERT INTO areas (id, classification, name, abbrev, land_area, water_area, centroid_lat, centroid_lon, geometry)
+    VALUES ('ocd-division/country:us', 'country', 'United States', 'US', 0, 0, 39.8, -98.6,
+        ST_MakeEnvelope(-125, 24, -66, 50, 4326))
+    """,
+    """
+    INSERT INTO areas (id, classification, name, abbrev, land_area, water_area, centroid_lat, centroid_lon, geometry)
+    SELECT 'ocd-division/country:us/state:' || code, 'state', 'State ' || upper(code), upper(code),
+        1000000, 1000, lat0 + :size / 2, lon0 + :size / 2,
+        ST_MakeEnvelope(lon0, lat0, lon0 + :size, lat0 + :size, 4326)
+    FROM bench_states
+    """,
+    """
+    INSERT INTO areas (id, classification, name, district_number, land_area, water_area, centroid_lat, centroid_lon, geometry)
+    SELECT 'ocd-division/country:us/state:' || code || '/cd:' || d, 'congressional_district',
+        'State ' || upper(code) || ' District ' || d, d::text,
+        100000, 100, lat0 + :size / 2, lon0 + (d - 0.5) * :size / :districts,
+        ST_MakeEnvelope(lon0 + (d - 1) * :size / :districts, lat0, lon0 + d * :size / :districts, lat0 + :size, 4326)
+    FROM bench_states, generate_series(1, :districts) d
+    """,
+    """
+    CREATE TEMP TABLE bench_zips AS
+    SELECT lpad((10000 + s.i * :zips + z)::text, 5, '0') AS zip, s.code,
+        s.lat0 + 0.1 + random() * (:size - 0.2) AS lat,
+        s.lon0 + 0.1 + random() * (:size - 0.2) AS lon,
+        s.lon0
+    FROM bench_states s, generate_series(0, :zips - 1) z
+    """,
+    "ALTER TABLE bench_zips ADD COLUMN district int",
+    """
+    UPDATE bench_zips SET district = least(:districts, floor((lon - lon0) / (:size / :districts))::int + 1)
+    """,
+    # ZIP shapes are buffered points - 256 vertices each, so geometry payloads are realistic
+    """
+    INSERT INTO areas (id, classification, name, geo_id, land_area, water_area, centroid_lat, centroid_lon, geometry)
+    SELECT 'ocd-division/country:us/zipcode:' || zip, 'zipcode', zip, zip,
+        (random() * 1e8)::bigint, (random() * 1e6)::bigint, lat, lon,
+        ST_Buffer(ST_SetSRID(ST_MakePoint(lon, lat), 4326), 0.05 + random() * 0.05, 64)
+    FROM bench_zips
+    """,
+    # --- People ---
+    """
+    CREATE TEMP TABLE bench_people AS
+    SELECT 'ocd-person/bench-sen-' || code || '-' || k AS id, 'ocd-division/country:us' AS jurisdiction_area_id,
+        'ocd-division/country:us/state:' || code AS constituent_area_id, 'upper' AS chamber, code, NULL::int AS district
+    FROM bench_states, generate_series(1, 2) k
+    UNION ALL
+    SELECT 'ocd-person/bench-rep-' || code || '-' || d, 'ocd-division/country:us',
+        'ocd-division/country:us/state:' || code || '/cd:' || d, 'lower', code, d
+    FROM bench_states, generate_series(1, :districts) d
+    UNION ALL
+    SELECT 'ocd-person/bench-leg-' || code || '-' || d || '-' || k, 'ocd-division/country:us/state:' || code,
+        'ocd-division/country:us/state:' || code || '/cd:' || d, CASE WHEN k % 2 = 0 THEN 'upper' ELSE 'lower' END,
+        code, d
+    FROM bench_states, generate_series(1, :districts) d, generate_series(1, :legislators) k
+    """,
+    """
+    INSERT INTO people (id, jurisdiction_area_id, constituent_area_id, chamber, name, first_name, last_name,
+        other_names, image, email, offices, links, ids, sources)
+    SELECT id, jurisdiction_area_id, constituent_area_id, chamber,
+        'Member ' || substr(md5(id), 1, 8), 'Member', substr(md5(id), 1, 8),
+        ARRAY[substr(md5(id), 9, 8)], 'https://example.org/' || md5(id) || '.jpg', md5(id) || '@example.org',
+        jsonb_build_array(jsonb_build_object('classification', 'capitol', 'address', '1 Capitol Way', 'voice', '555-0100')),
+        jsonb_build_array(jsonb_build_object('url', 'https://example.org/' || md5(id))),
+        jsonb_build_object('twitter', substr(md5(id), 1, 10)),
+        jsonb_build_array(jsonb_build_object('url', 'https://example.org/sources/' || md5(id)))
+    FROM bench_people
+    """,
+    """
+    INSERT INTO person_area (person_id, area_id, relationship_type)
+    SELECT p.id, 'ocd-division/country:us/zipcode:' || z.zip, 'constituent_zip_code'
+    FROM bench_zips z
+    JOIN bench_people p ON p.code = z.code AND (p.district IS NULL OR p.district = z.district)
+    """,
+    # --- Bills ---
+    """
+    CREATE TEMP TABLE bench_bills AS
+    SELECT j.jurisdiction_area_id, j.jcode, n,
+        timestamp '2023-01-01' + random() * interval '700 days' AS base,
+        1 + floor(random() * 25)::int AS action_count,
+        random() < :vote_fraction AS has_votes
+    FROM (
+        SELECT 'ocd-division/country:us' AS jurisdiction_area_id, 'us' AS jcode
+        UNION ALL
+        SELECT 'ocd-division/country:us/state:' || code, code FROM bench_states
+    ) j, generate_series(1, :bills) n
+    """,
+    f"""
+    INSERT INTO bills (id, title, canonical_id, jurisdiction_area_id, legislative_session, from_organization,
+        classification, subject, abstracts, other_titles, other_identifiers, actions, sponsorships,
+        related_bills, versions, documents, citations, sources, extras,
+        latest_action_date, first_action_date, updated_at, created_at, jurisdiction_level, ai_summary)
+    SELECT 'ocd-bill/bench-' || b.jcode || '-' || b.n,
+        'An act relating to ' || w1 || ' and ' || w2 || ' (' || b.n || ')',
+        CASE WHEN b.n % 2 = 0 THEN 'HB ' ELSE 'SB ' END || b.n,
+        b.jurisdiction_area_id, '2025-2026',
+        jsonb_build_object('id', 'ocd-organization/' || b.jcode, 'name', 'Legislature', 'classification', 'legislature'),
+        '["bill"]'::jsonb,
+        jsonb_build_array(jsonb_build_object('name', w1), jsonb_build_object('name', w2)),
+        jsonb_build_array(jsonb_build_object('abstract', repeat('Concerning ' || w1 || ' programs and ' || w2 || ' funding. ', 8), 'note', 'summary')),
+        jsonb_build_array(jsonb_build_object('title', 'Short title: ' || w2 || ' act', 'note', '')),
+        jsonb_build_array('X' || b.n),
+        (
+            SELECT jsonb_agg(jsonb_build_object(
+                'date', to_char(b.base - (k - 1) * interval '3 days', 'YYYY-MM-DD'),
+                'description', 'Referred to committee on ' || w1,
+                'classification', '["referral-committee"]'::jsonb,
+                'organization', jsonb_build_object('name', 'House')
+            ) ORDER BY k)
+            FROM generate_series(1, b.action_count) k
+        ),
+        (
+            SELECT jsonb_agg(jsonb_build_object('name', 'Member ' || k, 'primary', k = 1, 'classification', 'sponsor'))
+            FROM generate_series(1, 1 + b.n % 15) k
+        ),
+        '[]'::jsonb,
+        (
+            SELECT jsonb_agg(jsonb_build_object('note', 'Version ' || k, 'date', to_char(b.base, 'YYYY-MM-DD'),
+                'links', jsonb_build_array(jsonb_build_object('url', 'https://example.org/' || b.jcode || '/' || b.n || '/' || k || '.pdf',
+                    'media_type', 'application/pdf'))))
+            FROM generate_series(1, 1 + b.n % 5) k
+        ),
+        jsonb_build_array(jsonb_build_object('note', 'Fiscal note', 'links', jsonb_build_array(jsonb_build_object('url', 'https://example.org/fn/' || b.n)))),
+        '[]'::jsonb,
+        jsonb_build_array(jsonb_build_object('url', 'https://example.org/bills/' || b.jcode || '/' || b.n)),
+        '{{}}'::jsonb,
+        b.base, b.base - (b.action_count - 1) * interval '3 days', b.base + interval '1 day',
+        b.base - (b.action_count + 30) * interval '1 day',
+        CASE WHEN b.jcode = 'us' THEN 'federal' ELSE 'state' END,
+        CASE WHEN b.n % 2 = 0 THEN repeat('This bill would change ' || w1 || ' rules. ', 12) END
+    FROM bench_bills b,
+    LATERAL (
+        SELECT (ARRAY{SEARCH_WORDS!r})[1 + (b.n * 7 + length(b.jcode)) % {len(SEARCH_WORDS)}] AS w1,
+            (ARRAY{SEARCH_WORDS!r})[1 + (b.n * 13) % {len(SEARCH_WORDS)}] AS w2
+    ) words
+    """,
+    # --- Votes - every member of the jurisdiction votes, triggers fill vote_records/latest_vote_date ---
+    """
+    CREATE TEMP TABLE bench_voters AS
+    SELECT jurisdiction_area_id, array_agg(id ORDER BY id) AS ids
+    FROM bench_people GROUP BY jurisdiction_area_id
+    """,
+    """
+    INSERT INTO vote_events (id, bill_id, identifier, motion_text, motion_classification, start_date, result,
+        chamber, legislative_session, votes, counts, sources, extras)
+    SELECT 'ocd-vote/bench-' || b.jcode || '-' || b.n || '-' || k, 'ocd-bill/bench-' || b.jcode || '-' || b.n,
+        'Roll call ' || k, CASE WHEN k = 1 THEN 'Final passage' ELSE 'Amendment ' || k END,
+        '["passage"]'::jsonb, b.base - (k - 1) * interval '2 days', 'pass',
+        CASE WHEN k % 2 = 0 THEN 'upper' ELSE 'lower' END, '2025-2026',
+        ballots.votes,
+        jsonb_build_array(jsonb_build_object('option', 'yes', 'value', ballots.yes),
+            jsonb_build_object('option', 'no', 'value', ballots.total - ballots.yes)),
+        '[]'::jsonb, '{}'::jsonb
+    FROM bench_bills b
+    JOIN bench_voters v ON v.jurisdiction_area_id = b.jurisdiction_area_id
+    CROSS JOIN generate_series(1, :votes_per_bill) k
+    CROSS JOIN LATERAL (
+        SELECT jsonb_agg(jsonb_build_object('option', CASE WHEN r < 0.6 THEN 'yes' ELSE 'no' END,
+                'voter_name', 'Member ' || substr(md5(voter_id), 1, 8), 'voter_id', voter_id)) AS votes,
+            count(*) FILTER (WHERE r < 0.6) AS yes, count(*) AS total
+        FROM (SELECT voter_id, random() AS r FROM unnest(v.ids) voter_id) ballot
+    ) ballots
+    WHERE b.has_votes
+    """,
+    # --- Precincts around each ZIP ---
+    """
+    INSERT INTO precinct_election_result_area (precinct_id, state, votes_dem, votes_rep, votes_total, pct_dem_lead,
+        official_boundary, geometry, centroid_lat, centroid_lon)
+    SELECT 'bench-' || zip || '-' || k, upper(code), dem, rep, dem + rep, (dem - rep)::float / (dem + rep), true,
+        ST_Buffer(ST_SetSRID(ST_MakePoint(plon, plat), 4326), 0.01, 16), plat, plon
+    FROM (
+        SELECT z.zip, z.code, k,
+            z.lat + (random() - 0.5) * 0.2 AS plat, z.lon + (random() - 0.5) * 0.2 AS plon,
+            1 + floor(random() * 2000)::int AS dem, 1 + floor(random() * 2000)::int AS rep
+        FROM bench_zips z, generate_series(1, :precincts) k
+    ) p
+    """,
+]
+
+
+def lat_lon_to_tile(lat: float, lon: float, zoom: int):
+    n = 2 ** zoom
+    x = int((lon + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return zoom, x, y
+
+
+def manifest(connection, samples: int) -> dict:
+    """
+    Ids the load test picks its requests from.
+    """
+    def column(sql):
+        return [row[0] for row in connection.execute(text(sql), {"samples": samples})]
+
+    zips = connection.execute(text(
+        "SELECT zip, lat, lon FROM bench_zips ORDER BY md5(zip) LIMIT :samples"
+    ), {"samples": samples}).all()
+    return {
+        "zip_codes": [z.zip for z in zips],
+        "tiles": [lat_lon_to_tile(z.lat, z.lon, zoom) for z in zips for zoom in (8, 11)],
+        "area_ids": column("SELECT id FROM areas WHERE classification <> 'zipcode' ORDER BY md5(id) LIMIT :samples"),
+        "person_ids": column("SELECT id FROM bench_people ORDER BY md5(id) LIMIT :samples"),
+        "bill_ids": column("SELECT id FROM bills ORDER BY md5(id) LIMIT :samples"),
+        "voted_bill_ids": column(
+            "SELECT DISTINCT bill_id FROM vote_events ORDER BY bill_id LIMIT :samples"
+        ),
+        "state_jurisdiction_ids": column(
+            "SELECT id FROM areas WHERE classification = 'state' ORDER BY id LIMIT :samples"
+        ),
+        "search_terms": SEARCH_WORDS,
+    }
+
+
+def database_url() -> str:
+    load_dotenv(Path(__file__).resolve().parent.parent / ".env")
+    return (
+        f"postgresql+psycopg2://{os.getenv('POSTGRES_USER', 'postgres')}:{quote(os.getenv('POSTGRES_DB_PASSWORD', ''))}"
+        f"@{os.getenv('POSTGRES_HOST', 'localhost')}:{os.getenv('POSTGRES_PORT', '5432')}"
+        f"/{os.getenv('POSTGRES_DB', 'repcheck_bench')}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="Default: POSTGRES_* from the environment/.env")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplies ZIPs, bills and precincts")
+    parser.add_argument("--states", type=int, default=10)
+    parser.add_argument("--districts", type=int, default=4, help="Congressional districts per state")
+    parser.add_argument("--legislators", type=int, default=6, help="State legislators per district")
+    parser.add_argument("--zips", type=int, default=200, help="ZIP codes per state")
+    parser.add_argument("--bills", type=int, default=2000, help="Bills per jurisdiction (country and each state)")
+    parser.add_argument("--vote-fraction", type=float, default=0.3, help="Share of bills with roll calls")
+    parser.add_argument("--votes-per-bill", type=int, default=3)
+    parser.add_argument("--precincts", type=int, default=5, help="Precincts per ZIP code")
+    parser.add_argument("--seed", type=float, default=0.42, help="Between -1 and 1")
+    parser.add_argument("--reset", action="store_true", help="Empty all the tables first")
+    parser.add_argument("--manifest", default="bench_manifest.json")
+    parser.add_argument("--samples", type=int, default=200, help="Ids per kind in the manifest")
+    args = parser.parse_args()
+
+    url = args.database_url or database_url()
+    if not args.database_url and not os.getenv("POSTGRES_DB"):
+        log.info("POSTGRES_DB not set - using the repcheck_bench database")
+    engine = create_engine(url)
+
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as connection:
+        ensure_derived_schema(connection)
+
+    params = {
+        "seed": args.seed,
+        "size": STATE_SIZE_DEGREES,
+        "states": args.states,
+        "districts": args.districts,
+        "legislators": args.legislators,
+        "zips": max(1, round(args.zips * args.scale)),
+        "bills": max(1, round(args.bills * args.scale)),
+        "vote_fraction": args.vote_fraction,
+        "votes_per_bill": args.votes_per_bill,
+        "precincts": max(1, round(args.precincts * args.scale)),
+    }
+    with engine.begin() as connection:
+        if args.reset:
+            connection.execute(text(f"TRUNCATE {', '.join(reversed(TABLES))} CASCADE"))
+
+        for statement in GENERATE_SQL:
+            start = time.perf_counter()
+            result = connection.execute(text(statement), params)
+            log.info(f"{' '.join(statement.split())[:70]}... {result.rowcount} rows in {time.perf_counter() - start:.1f}s")
+
+        data = manifest(connection, args.samples)
+        counts = {
+            table: connection.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+            for table in TABLES + ["vote_records", "area_simplified_geometries"]
+        }
+
+    data["params"] = params
+    data["counts"] = counts
+    Path(args.manifest).write_text(json.dumps(data, indent=2))
+    log.info(f"Generated {counts}, manifest in {args.manifest}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,312 @@
+"""
+Concurrent load against every router of a running server, using the ids in the
+manifest benchmarks.generate_data wrote. Each scenario (an endpoint plus a
+combination of filters) runs on its own for --duration seconds with
+--concurrency keep-alive connections, and reports throughput and p50/p95/p99
+latency - as a table, and as JSON with --output so runs can be compared.
+
+    python -m benchmarks.load_test --manifest bench_manifest.json --output before.json
+    python -m benchmarks.load_test --manifest bench_manifest.json --compare before.json
+
+Write scenarios (summaries) only run with --include-writes and --api-key.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit, quote
+import argparse
+import http.client
+import json
+import math
+import platform
+import random
+import statistics
+import threading
+import time
+
+
+@dataclass
+class Scenario:
+    name: str
+    router: str
+    # (rng, manifest) -> (method, path with query, JSON body or None)
+    build: Callable[[random.Random, Dict], Tuple[str, str, Optional[object]]]
+    write: bool = False
+
+
+def get(path: str, **params) -> Tuple[str, str, None]:
+    query = urlencode([(k, v) for k, values in params.items() for v in (values if isinstance(values, list) else [values])])
+    path = quote(path, safe="/:")
+    return "GET", f"{path}?{query}" if query else path, None
+
+
+# The bills list 400s without a date_type
+ZIP_BILLS_DEFAULTS = {"date_type": "latest_action_date"}
+
+
+def zip_bills(**params):
+    params = {**ZIP_BILLS_DEFAULTS, **params}
+    return lambda rng, m: get(f"/api/zipcodes/{rng.choice(m['zip_codes'])}/bills", **params)
+
+
+SCENARIOS = [
+    # --- status ---
+    Scenario("status_health", "status", lambda rng, m: get("/api/status/health")),
+    Scenario("status_caches", "status", lambda rng, m: get("/api/status/caches")),
+    # --- people ---
+    Scenario("people_by_zip", "people", lambda rng, m: get(f"/api/people/{rng.choice(m['zip_codes'])}")),
+    Scenario("people_by_ids", "people", lambda rng, m: ("POST", "/api/people", rng.sample(m["person_ids"], min(10, len(m["person_ids"]))))),
+    Scenario("people_batch_50", "people", lambda rng, m: (
+        "POST", "/api/people/batch", {"zip_codes": rng.sample(m["zip_codes"], min(50, len(m["zip_codes"])))}
+    )),
+    Scenario("people_batch_50_bill_ids", "people", lambda rng, m: (
+        "POST", "/api/people/batch",
+        {"zip_codes": rng.sample(m["zip_codes"], min(50, len(m["zip_codes"]))), "include_bill_ids": True, "bill_ids_limit": 100},
+    )),
+    # --- areas ---
+    Scenario("zipcode", "areas", lambda rng, m: get(f"/api/zipcodes/{rng.choice(m['zip_codes'])}")),
+    Scenario("zipcode_zoom10_precision5", "areas", lambda rng, m: get(
+        f"/api/zipcodes/{rng.choice(m['zip_codes'])}", zoom=10, precision=5
+    )),
+    Scenario("area", "areas", lambda rng, m: get(f"/api/areas/{rng.choice(m['area_ids'])}")),
+    Scenario("area_zoom6", "areas", lambda rng, m: get(f"/api/areas/{rng.choice(m['area_ids'])}", zoom=6)),
+    Scenario("precincts", "areas", lambda rng, m: get(f"/api/precincts/{rng.choice(m['zip_codes'])}")),
+    Scenario("precincts_radius10_precision5", "areas", lambda rng, m: get(
+        f"/api/precincts/{rng.choice(m['zip_codes'])}", radius_miles=10, precision=5
+    )),
+    Scenario("precinct_tile", "areas", lambda rng, m: get("/api/precincts/tiles/{}/{}/{}.mvt".format(*rng.choice(m["tiles"])))),
+    # --- bills list, one scenario per filter combination ---
+    Scenario("zip_bills_default", "bills", zip_bills()),
+    Scenario("zip_bills_page5", "bills", zip_bills(page=5)),
+    Scenario("zip_bills_has_votes", "bills", zip_bills(has_votes="true")),
+    Scenario("zip_bills_federal", "bills", zip_bills(jurisdiction_level="federal")),
+    Scenario("zip_bills_state_date_range", "bills", zip_bills(
+        jurisdiction_level="state", date_type="latest_action_date", start_date="2024-01-01", end_date="2024-06-30"
+    )),
+    Scenario("zip_bills_representatives", "bills", lambda rng, m: get(
+        f"/api/zipcodes/{rng.choice(m['zip_codes'])}/bills", **ZIP_BILLS_DEFAULTS,
+        representative_ids=rng.sample(m["person_ids"], min(3, len(m["person_ids"]))),
+    )),
+    Scenario("zip_bills_sort_vote_date", "bills", zip_bills(sort_by="latest_vote_date", has_votes="true")),
+    Scenario("zip_bills_sort_title_asc", "bills", zip_bills(sort_by="title", sort_order="asc")),
+    Scenario("zip_bills_cursor", "bills", zip_bills(cursor="")),
+    Scenario("zip_bills_cursor_estimate", "bills", zip_bills(cursor="", count="estimate")),
+    Scenario("zip_bills_sparse_vote_counts", "bills", zip_bills(fields="title,latest_action_date", include="vote_counts")),
+    Scenario("zip_bills_page_size_100", "bills", zip_bills(page_size=100, include="none")),
+    Scenario("bill", "bills", lambda rng, m: get("/api/bills", bill_id=rng.choice(m["bill_ids"]))),
+    Scenario("bill_sparse", "bills", lambda rng, m: get(
+        "/api/bills", bill_id=rng.choice(m["bill_ids"]), fields="title,actions", include="none"
+    )),
+    Scenario("bill_votes", "bills", lambda rng, m: get(
+        "/api/bills/votes", representative_ids=rng.sample(m["person_ids"], min(3, len(m["person_ids"]))),
+        bill_id=rng.choice(m["voted_bill_ids"] or m["bill_ids"]),
+    )),
+    Scenario("representative_votes", "bills", lambda rng, m: get(
+        "/api/bills/votes", representative_ids=rng.choice(m["person_ids"]), limit=100
+    )),
+    Scenario("bill_search", "bills", lambda rng, m: get("/api/bills/search", q=rng.choice(m["search_terms"]))),
+    Scenario("bill_search_two_terms_zip", "bills", lambda rng, m: get(
+        "/api/bills/search", q=" ".join(rng.sample(m["search_terms"], 2)), zip_code=rng.choice(m["zip_codes"])
+    )),
+    Scenario("bill_search_state_has_votes", "bills", lambda rng, m: get(
+        "/api/bills/search", q=rng.choice(m["search_terms"]), jurisdiction_level="state", has_votes="true"
+    )),
+    Scenario("bill_versions", "bills", lambda rng, m: get("/api/bills/versions", page=rng.randint(1, 20), per_page=100)),
+    Scenario("bill_versions_export_state", "bills", lambda rng, m: get(
+        "/api/bills/versions/export", jurisdiction_area_id=rng.choice(m["state_jurisdiction_ids"])
+    )),
+    # --- writes ---
+    Scenario("bill_summary", "bills", lambda rng, m: (
+        "POST", "/api/bills/summary", {"bill_id": rng.choice(m["bill_ids"]), "summary": f"Benchmark summary {rng.random()}"}
+    ), write=True),
+    Scenario("bill_summaries_100", "bills", lambda rng, m: (
+        "POST", "/api/bills/summaries",
+        {"summaries": [{"bill_id": b, "summary": f"Benchmark summary {rng.random()}"} for b in rng.sample(m["bill_ids"], min(100, len(m["bill_ids"])))]},
+    ), write=True),
+]
+
+
+def percentile(values: List[float], p: float) -> float:
+    # Nearest-rank
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+class Worker:
+    """
+    One keep-alive connection, sending the scenario's requests back to back.
+    """
+
+    def __init__(self, base_url: str, headers: Dict[str, str], timeout: float):
+        url = urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        self.connection = connection_class(url.hostname, url.port, timeout=timeout)
+        self.prefix = url.path.rstrip("/")
+        self.headers = headers
+
+    def request(self, method: str, path: str, body) -> Tuple[int, int]:
+        headers = dict(self.headers)
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        try:
+            self.connection.request(method, self.prefix + path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+            return response.status, len(response.read())
+        except (http.client.HTTPException, OSError):
+            # Reconnect on the next request
+            self.connection.close()
+            raise
+
+    def close(self):
+        self.connection.close()
+
+
+def run_scenario(scenario: Scenario, manifest: Dict, args, seed: int) -> Dict:
+    headers = {"Accept-Encoding": "gzip, br", "Connection": "keep-alive"}
+    if args.api_key:
+        headers["X-REPCHECK-API-KEY"] = args.api_key
+
+    lock = threading.Lock()
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    sizes: List[int] = []
+    errors = 0
+
+    def work(worker_number: int):
+        nonlocal errors
+        rng = random.Random(seed * 1000 + worker_number)
+        worker = Worker(args.base_url, headers, args.timeout)
+        warmup_ends = time.perf_counter() + args.warmup
+        ends = warmup_ends + args.duration
+        try:
+            while True:
+                now = time.perf_counter()
+                if now >= ends:
+                    break
+                method, path, body = scenario.build(rng, manifest)
+                start = time.perf_counter()
+                try:
+                    status, size = worker.request(method, path, body)
+                except (http.client.HTTPException, OSError):
+                    status, size = None, 0
+                elapsed = time.perf_counter() - start
+                if start < warmup_ends:
+                    continue
+                with lock:
+                    if status is None:
+                        errors += 1
+                        continue
+                    statuses[status] = statuses.get(status, 0) + 1
+                    # Errors take a different (usually much shorter) path - keep them out of the latencies
+                    if status >= 400:
+                        errors += 1
+                        continue
+                    latencies.append(elapsed)
+                    sizes.append(size)
+        finally:
+            worker.close()
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(work, range(args.concurrency)))
+
+    result = {
+        "router": scenario.router,
+        # Successful ones - throughput and latencies don't include errors
+        "requests": len(latencies),
+        "errors": errors,
+        "error_rate": errors / (len(latencies) + errors) if latencies or errors else 0.0,
+        "status_counts": {str(k): v for k, v in sorted(statuses.items())},
+        "throughput_rps": len(latencies) / args.duration,
+        "latency_ms": None,
+        "mean_response_bytes": statistics.fmean(sizes) if sizes else None,
+    }
+    if latencies:
+        result["latency_ms"] = {
+            "p50": percentile(latencies, 50) * 1000,
+            "p95": percentile(latencies, 95) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "mean": statistics.fmean(latencies) * 1000,
+            "max": max(latencies) * 1000,
+        }
+    return result
+
+
+def print_table(results: Dict[str, Dict], baseline: Optional[Dict[str, Dict]]):
+    header = f"{'scenario':<34} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+    if baseline:
+        header += f" {'p95 vs base':>12}"
+    print(header)
+    for name, r in results.items():
+        latency = r["latency_ms"] or {"p50": float("nan"), "p95": float("nan"), "p99": float("nan")}
+        line = (
+            f"{name:<34} {r['throughput_rps']:>9.1f} {latency['p50']:>9.2f} {latency['p95']:>9.2f} "
+            f"{latency['p99']:>9.2f} {r['errors']:>7}"
+        )
+        base = (baseline or {}).get(name)
+        if base and base.get("latency_ms") and r["latency_ms"]:
+            line += f" {(r['latency_ms']['p95'] / base['latency_ms']['p95'] - 1) * 100:>+11.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--manifest", default="bench_manifest.json")
+    parser.add_argument("--concurrency", type=int, default=16, help="Connections per scenario")
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds before each scenario")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--scenarios", nargs="*", help="Only these scenarios (or routers: status, people, areas, bills)")
+    parser.add_argument("--include-writes", action="store_true", help="Also run the summary write scenarios")
+    parser.add_argument("--api-key", help="X-REPCHECK-API-KEY for the write scenarios")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the results as JSON here")
+    parser.add_argument("--compare", help="Results JSON of an earlier run to compare p95 against")
+    args = parser.parse_args()
+
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+
+    scenarios = [
+        s for s in SCENARIOS
+        if (not args.scenarios or s.name in args.scenarios or s.router in args.scenarios)
+        and (not s.write or args.include_writes)
+    ]
+    if any(s.write for s in scenarios) and not args.api_key:
+        parser.error("--include-writes needs --api-key")
+
+    results = {}
+    for number, scenario in enumerate(scenarios):
+        results[scenario.name] = run_scenario(scenario, manifest, args, args.seed + number)
+        r = results[scenario.name]
+        print(f"{scenario.name}: {r['requests']} requests, {r['errors']} errors", flush=True)
+        if r["errors"]:
+            print(f"  WARNING: {r['error_rate']:.1%} of requests failed {r['status_counts']} - not in the latencies", flush=True)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["scenarios"]
+    print()
+    print_table(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "finished_at": datetime.now(timezone.utc).isoformat(),
+                "base_url": args.base_url,
+                "concurrency": args.concurrency,
+                "duration_s": args.duration,
+                "warmup_s": args.warmup,
+                "seed": args.seed,
+                "python": platform.python_version(),
+                "data": {"params": manifest.get("params"), "counts": manifest.get("counts")},
+                "scenarios": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
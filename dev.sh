@@ -1,4 +1,5 @@
 #!/bin/zsh
 # Assume we are running on mac
 
+python -m app.database.derived schema
 uvicorn app.main:app --reload